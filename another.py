@@ -1,36 +1,65 @@
 import sys
-import numpy
+import windows
+from ordering import Ordering
+from book import Book
+from solver import Solver
+from tablebase import Tablebase, reaches, probe
+from stats import Stats
+from evaluation import Threats
+from profiling import profiled
 
 BOARD_WIDTH = 7
 BOARD_HEIGHT = 6
 SEARCH_DEPTH = 4
+# Depth used by bestMove. Alpha-beta pruning reaches it in about the
+# time the exhaustive minimax needs for SEARCH_DEPTH. Even, so the
+# leaves are scored for the computer, see negamax.
+PRUNED_SEARCH_DEPTH = 8
 
 COMPUTER_PLAYER = 1
 HUMAN_PLAYER = -1
 
+# Order in which the searches try columns, center first. Killer moves
+# are kept per remaining search depth. Cleared by every bestMove, so
+# a search doesn't depend on the ones before it.
+moveOrdering = Ordering(BOARD_WIDTH)
+
+# Counters of the last bestMove search, see stats.Stats
+searchStats = Stats()
+
+# Opening book built by book.py, None when there is none
+openingBook = Book.open()
+
+# Endgame tablebase built by tablebase.py and the exact solver behind
+# it, which is only made once a game gets that far
+endgameTable = Tablebase.open()
+exactSolver = None
+
 #
 # Method that runs the minimax algorithm and returns
 # the move and score of each call.
 #
 
 def minimax(gameState, depth, player, opponent, scoreEvalAlg):
+    searchStats.nodes += 1
+
     availableMoves = BOARD_WIDTH
     for i in range(0, BOARD_WIDTH):
         if gameState[0][i] != 0:
             availableMoves -= 1
 
     if depth == 0 or availableMoves == 0:
+        searchStats.leaves += 1
         score = scoreEvalAlg(gameState, player, opponent)
         return None, score
 
     bestScore = None
     bestMove = None
 
-    for i in range(0, BOARD_WIDTH):
-        # If moves cannot be made on column, skip it
-        if gameState[0][i] != 0:
-            continue
+    # Columns that are not full, in search order
+    columns = [i for i in range(0, BOARD_WIDTH) if gameState[0][i] == 0]
 
+    for i in moveOrdering.order(player, columns, depth):
         currentMove = [0, i]
 
         for j in range(0, BOARD_HEIGHT - 1):
@@ -42,9 +71,17 @@ def minimax(gameState, depth, player, opponent, scoreEvalAlg):
                 gameState[j+1][i] = player
                 currentMove[0] = j+1
 
-        # Recursive minimax call, with reduced depth
-        move, score = minimax(gameState, depth - 1,
-                              opponent, player, scoreEvalAlg)
+        # A move that completes a line ends the game, so only the
+        # lines through it need checking and there is no need to recurse
+        if checkWinAt(gameState, currentMove[0], currentMove[1]) != 0:
+            if player == COMPUTER_PLAYER:
+                score = float("inf")
+            else:
+                score = float("-inf")
+        else:
+            # Recursive minimax call, with reduced depth
+            move, score = minimax(gameState, depth - 1,
+                                  opponent, player, scoreEvalAlg)
 
         gameState[currentMove[0]][currentMove[1]] = 0
 
@@ -59,6 +96,70 @@ def minimax(gameState, depth, player, opponent, scoreEvalAlg):
 
     return bestMove, bestScore
 
+#
+# Negamax version of minimax with alpha-beta pruning. Scores are from
+# the point of view of the player to move, which is how scoreEvalAlg
+# already scores the leaves. minimax scores its leaves the same way
+# but maximizes for the computer wherever it is, so it only agrees at
+# even depths with the computer to move, where the leaves are the
+# computer's. There the result at the root matches minimax for the
+# same column order while skipping refuted branches. At odd depths
+# minimax maximizes the human's leaf scores and the two differ. Column
+# heights are kept in moveHeights instead of rescanning the board.
+# When scoreEvalAlg is a Threats it is kept in step with every move
+# made and unmade, so a leaf reads its score instead of scanning.
+#
+
+
+def negamax(gameState, moveHeights, depth, alpha, beta, player, opponent,
+            scoreEvalAlg):
+    stats = searchStats
+    stats.nodes += 1
+    incremental = isinstance(scoreEvalAlg, Threats)
+
+    columns = [i for i in range(0, BOARD_WIDTH)
+               if moveHeights[i] < BOARD_HEIGHT]
+
+    if depth == 0 or not columns:
+        stats.leaves += 1
+        score = scoreEvalAlg(gameState, player, opponent)
+        return None, score
+
+    bestScore = None
+    bestMove = None
+
+    for index, i in enumerate(moveOrdering.order(player, columns, depth)):
+        row = BOARD_HEIGHT - 1 - moveHeights[i]
+        gameState[row][i] = player
+        moveHeights[i] += 1
+        if incremental:
+            scoreEvalAlg.place(row, i, player)
+
+        if checkWinAt(gameState, row, i) != 0:
+            score = float("inf")
+        else:
+            move, score = negamax(gameState, moveHeights, depth - 1,
+                                  -beta, -alpha, opponent, player,
+                                  scoreEvalAlg)
+            score = -score
+
+        if incremental:
+            scoreEvalAlg.remove(row, i, player)
+        moveHeights[i] -= 1
+        gameState[row][i] = 0
+
+        if bestScore == None or score > bestScore:
+            bestScore = score
+            bestMove = [row, i]
+        if bestScore > alpha:
+            alpha = bestScore
+        if alpha >= beta:
+            moveOrdering.cutoff(player, i, depth, depth, index)
+            stats.cutoff(depth)
+            break
+
+    return bestMove, bestScore
+
 #
 # Method that calculates the heuristic value of a given
 # board state. The heuristic adds a point to a player
@@ -240,14 +341,107 @@ def scoreOfLine(
 
     return score
 
+#
+# Index tables for the vectorized evaluator, taken from the window
+# table shared with connect4. Every four-cell window on the board is
+# kept as four flat row-major indices, together with the direction of
+# its line. Built on first use, so numpy is only imported once the
+# vectorized evaluator runs.
+#
+
+
+def buildWindows():
+    import numpy
+    table = windows.table(BOARD_WIDTH, BOARD_HEIGHT)
+    indexes = numpy.array([[(BOARD_HEIGHT - 1 - y) * BOARD_WIDTH + x
+                            for x, y in cells] for cells in table.cells],
+                          dtype=numpy.intp)
+    directions = numpy.array(table.directions, dtype=numpy.intp)
+    return indexes, indexes * 4 + directions[:, None]
+
+
+WINDOWS = None
+WINDOW_KEYS = None
+
+#
+# Vectorized version of evaluateScore, returning the same values.
+# An empty coordinate scores a point in a direction when a window in
+# that direction holds it and three pieces of the same player, which
+# is what scoreOfLine counts. All 69 windows are scored at once on an
+# int8 copy of the board, and each (coordinate, direction) pair is
+# counted once per player.
+#
+
+
+def evaluateScoreVectorized(gameState, player, opponent):
+    global WINDOWS, WINDOW_KEYS
+    import numpy
+    if WINDOWS is None:
+        WINDOWS, WINDOW_KEYS = buildWindows()
+
+    board = numpy.array(gameState, dtype=numpy.int8).ravel()
+    values = board[WINDOWS]
+    sums = values.sum(axis=1)
+
+    # Same precedence as checkWin when both players have a line
+    if (sums == 4 * HUMAN_PLAYER).any():
+        winner = HUMAN_PLAYER
+    elif (sums == 4 * COMPUTER_PLAYER).any():
+        winner = COMPUTER_PLAYER
+    else:
+        winner = 0
+
+    if winner == player:
+        return float("inf")
+    elif winner == opponent:
+        return float("-inf")
+
+    score = 0
+    for current, sign in ((player, 1), (opponent, -1)):
+        threats = sums == 3 * current
+        if threats.any():
+            keys = WINDOW_KEYS[threats][values[threats] == 0]
+            score += sign * numpy.unique(keys).size
+
+    return score
+
+#
+# Incremental version of evaluateScore, returning the same values.
+# Called on its own it counts the board from scratch; passed to
+# bestMove, the search keeps one Threats up to date under every move
+# and unmove, so each leaf costs a lookup instead of a full scan.
+#
+
+
+def evaluateScoreIncremental(gameState, player, opponent):
+    threats = Threats(gameState, BOARD_WIDTH, BOARD_HEIGHT,
+                      COMPUTER_PLAYER, HUMAN_PLAYER)
+    return threats(gameState, player, opponent)
+
 #
 # Method that executes the first call of the minimax method and
 # returns the move to be executed by the computer. It also verifies
-# if any immediate wins or loses are present.
+# if any immediate wins or loses are present. When report is given
+# the search deepens one ply at a time up to depth and report(depth,
+# column) is called after each finished depth. What the search did is
+# left in searchStats.
 #
 
 
-def bestMove(gameState, player, opponent, scoreEvalAlg):
+@profiled('bestMove')
+def bestMove(gameState, player, opponent, scoreEvalAlg,
+             depth=PRUNED_SEARCH_DEPTH, report=None):
+    global searchStats
+    searchStats = Stats()
+    moveOrdering.clear()
+    move = chooseMove(gameState, player, opponent, scoreEvalAlg, depth,
+                      report)
+    searchStats.order(moveOrdering)
+    searchStats.stop()
+    return move
+
+
+def chooseMove(gameState, player, opponent, scoreEvalAlg, depth, report):
     for i in range(0, BOARD_WIDTH):
         # If moves cannot be made on column, skip it
         if gameState[0][i] != 0:
@@ -264,7 +458,7 @@ def bestMove(gameState, player, opponent, scoreEvalAlg):
                 gameState[j+1][i] = player
                 currentMove[0] = j+1
 
-        winner = checkWin(gameState)
+        winner = checkWinAt(gameState, currentMove[0], currentMove[1])
         gameState[currentMove[0]][currentMove[1]] = 0
 
         if winner == COMPUTER_PLAYER:
@@ -286,130 +480,181 @@ def bestMove(gameState, player, opponent, scoreEvalAlg):
                 gameState[j+1][i] = opponent
                 currentMove[0] = j+1
 
-        winner = checkWin(gameState)
+        winner = checkWinAt(gameState, currentMove[0], currentMove[1])
         gameState[currentMove[0]][currentMove[1]] = 0
 
         if winner == HUMAN_PLAYER:
             return currentMove[1]
 
-    move, score = minimax(gameState, SEARCH_DEPTH,
-                          player, opponent, scoreEvalAlg)
+    move = bookMove(gameState, player)
+    if move != None:
+        searchStats.source = 'book'
+        return move
+
+    move = endgameMove(gameState, player)
+    if move != None:
+        searchStats.source = 'endgame'
+        return move
+
+    moveHeights = [sum(1 for row in gameState if row[i] != 0)
+                   for i in range(0, BOARD_WIDTH)]
+    if scoreEvalAlg == evaluateScoreIncremental:
+        scoreEvalAlg = Threats(gameState, BOARD_WIDTH, BOARD_HEIGHT,
+                               COMPUTER_PLAYER, HUMAN_PLAYER)
+    if report == None:
+        depths = [depth]
+    else:
+        depths = range(1, depth + 1)
+
+    for currentDepth in depths:
+        move, score = negamax(gameState, moveHeights, currentDepth,
+                              float("-inf"), float("inf"),
+                              player, opponent, scoreEvalAlg)
+        searchStats.iteration(currentDepth)
+        if report != None:
+            report(currentDepth, move[1])
     return move[1]
 
 
-def checkWin(gameState):
-    current = 0
-    currentCount = 0
-    computer_wins = 0
-    opponent_wins = 0
+#
+# Method that packs the board into the connect4.Board bitboard layout
+# used by the opening book, the tablebase and the solver. Returns the
+# pieces of the player to move, all pieces and the number of pieces.
+#
+
 
-    # Check horizontal wins
+def bitboards(gameState, player):
+    current = 0
+    mask = 0
+    pieces = 0
     for i in range(0, BOARD_HEIGHT):
         for j in range(0, BOARD_WIDTH):
-            if currentCount == 0:
-                if gameState[i][j] != 0:
-                    current = gameState[i][j]
-                    currentCount += 1
-            elif currentCount == 4:
-                if current == COMPUTER_PLAYER:
-                    computer_wins += 1
-                else:
-                    opponent_wins += 1
-                currentCount = 0
-                break
-            elif gameState[i][j] != current:
-                if gameState[i][j] != 0:
-                    current = gameState[i][j]
-                    currentCount = 1
-                else:
-                    current = 0
-                    currentCount = 0
-            else:
-                currentCount += 1
+            if gameState[i][j] != 0:
+                bit = 1 << (j * (BOARD_HEIGHT + 1) + BOARD_HEIGHT - 1 - i)
+                mask |= bit
+                pieces += 1
+                if gameState[i][j] == player:
+                    current |= bit
 
-        if currentCount == 4:
-            if current == COMPUTER_PLAYER:
-                computer_wins += 1
-            else:
-                opponent_wins += 1
-        current = 0
-        currentCount = 0
-
-    # Check vertical wins
-    for j in range(0, BOARD_WIDTH):
-        for i in range(0, BOARD_HEIGHT):
-            if currentCount == 0:
-                if gameState[i][j] != 0:
-                    current = gameState[i][j]
-                    currentCount += 1
-            elif currentCount == 4:
-                if current == COMPUTER_PLAYER:
-                    computer_wins += 1
-                else:
-                    opponent_wins += 1
-                currentCount = 0
-                break
-            elif gameState[i][j] != current:
-                if gameState[i][j] != 0:
-                    current = gameState[i][j]
-                    currentCount = 1
-                else:
-                    current = 0
-                    currentCount = 0
-            else:
-                currentCount += 1
+    return current, mask, pieces
 
-        if currentCount == 4:
+
+#
+# Method that looks the board up in the opening book. Returns the book
+# column or None.
+#
+
+
+def bookMove(gameState, player):
+    if openingBook == None:
+        return None
+
+    current, mask, pieces = bitboards(gameState, player)
+    move = openingBook.move(current, mask, BOARD_WIDTH, BOARD_HEIGHT)
+    if move == None or gameState[0][move] != 0:
+        return None
+    return move
+
+
+#
+# Method that plays the exact move once few enough cells are left,
+# from the endgame tablebase or solved on the spot. Returns the column
+# or None earlier in the game.
+#
+
+
+def endgameMove(gameState, player):
+    global exactSolver
+    current, mask, pieces = bitboards(gameState, player)
+    if not reaches(endgameTable, BOARD_WIDTH * BOARD_HEIGHT, pieces):
+        return None
+
+    if exactSolver == None:
+        exactSolver = Solver(BOARD_WIDTH, BOARD_HEIGHT)
+    exact = probe(endgameTable, exactSolver, current, mask, pieces)
+    if exact == None:
+        return None
+    return exact[0]
+
+
+#
+# Method that verifies if the piece at the given coordinate completes
+# four in a row. Only the vertical, horizontal and diagonal lines
+# through that coordinate are inspected, so it should be called with
+# the last move played. Returns the owner of the line or 0.
+#
+
+
+def checkWinAt(gameState, i, j):
+    current = gameState[i][j]
+    if current == 0:
+        return 0
+
+    for rowIncrement, columnIncrement in ((1, 0), (0, 1), (1, 1), (1, -1)):
+        count = 1
+
+        row = i + rowIncrement
+        column = j + columnIncrement
+        while (
+            0 <= row < BOARD_HEIGHT and
+            0 <= column < BOARD_WIDTH and
+            gameState[row][column] == current
+        ):
+            count += 1
+            row += rowIncrement
+            column += columnIncrement
+
+        row = i - rowIncrement
+        column = j - columnIncrement
+        while (
+            0 <= row < BOARD_HEIGHT and
+            0 <= column < BOARD_WIDTH and
+            gameState[row][column] == current
+        ):
+            count += 1
+            row -= rowIncrement
+            column -= columnIncrement
+
+        if count >= 4:
+            return current
+
+    return 0
+
+#
+# Every four-cell window on the board as (row, column) pairs, taken
+# from the window table shared with connect4. Built once at import so
+# checkWin only indexes the board.
+#
+
+
+def buildWinCells():
+    table = windows.table(BOARD_WIDTH, BOARD_HEIGHT)
+    return [tuple((BOARD_HEIGHT - 1 - y, x) for x, y in cells)
+            for cells in table.cells]
+
+
+WIN_CELLS = buildWinCells()
+
+#
+# Method that verifies if the current board is in a winning state
+# for any player. When both players have a line the human is
+# reported, as the line scans this replaced did.
+#
+
+
+def checkWin(gameState):
+    computerWins = False
+    for (i0, j0), (i1, j1), (i2, j2), (i3, j3) in WIN_CELLS:
+        current = gameState[i0][j0]
+        if (current != 0 and gameState[i1][j1] == current and
+                gameState[i2][j2] == current and
+                gameState[i3][j3] == current):
             if current == COMPUTER_PLAYER:
-                computer_wins += 1
+                computerWins = True
             else:
-                opponent_wins += 1
-        current = 0
-        currentCount = 0
-
-    # Check diagonal wins
-    np_matrix = numpy.array(gameState)
-    diags = [np_matrix[::-1, :].diagonal(i)
-             for i in range(-np_matrix.shape[0]+1, np_matrix.shape[1])]
-    diags.extend(np_matrix.diagonal(i)
-                 for i in range(np_matrix.shape[1]-1, -np_matrix.shape[0], -1))
-    diags_list = [n.tolist() for n in diags]
-
-    for i in range(0, len(diags_list)):
-        if len(diags_list[i]) >= 4:
-            for j in range(0, len(diags_list[i])):
-                if currentCount == 0:
-                    if diags_list[i][j] != 0:
-                        current = diags_list[i][j]
-                        currentCount += 1
-                elif currentCount == 4:
-                    if current == COMPUTER_PLAYER:
-                        computer_wins += 1
-                    else:
-                        opponent_wins += 1
-                    currentCount = 0
-                    break
-                elif diags_list[i][j] != current:
-                    if diags_list[i][j] != 0:
-                        current = diags_list[i][j]
-                        currentCount = 1
-                    else:
-                        current = 0
-                        currentCount = 0
-                else:
-                    currentCount += 1
-
-            if currentCount == 4:
-                if current == COMPUTER_PLAYER:
-                    computer_wins += 1
-                else:
-                    opponent_wins += 1
-            current = 0
-            currentCount = 0
-
-    if opponent_wins > 0:
-        return HUMAN_PLAYER
-    elif computer_wins > 0:
+                return HUMAN_PLAYER
+
+    if computerWins:
         return COMPUTER_PLAYER
     else:
         return 0
@@ -500,7 +745,8 @@ def playGame():
             score = 0
 
         print("Computer's turn.")
-        move = bestMove(gameState, player, opponent, evaluateScore)
+        move = bestMove(gameState, player, opponent,
+                        evaluateScoreIncremental)
         if move == None:
             break
 
@@ -0,0 +1,197 @@
+import argparse
+import json
+import sys
+import subprocess
+from time import time
+
+import connect4
+import another
+from solver import Solver
+from transposition import Table
+from ordering import Ordering
+
+# fixed positions, written as the columns played from the empty board
+# (1 based). in none of them can either side win on the next move,
+# so both engines have to search instead of taking a forced move
+POSITIONS = [
+  ('opening', 'empty', ''),
+  ('opening', 'center', '4'),
+  ('opening', 'center reply', '44'),
+  ('opening', 'four ply', '6532'),
+  ('opening', 'six ply', '647673'),
+  ('midgame', 'twelve ply', '742772574233'),
+  ('midgame', 'sixteen ply', '1174377451174277'),
+  ('midgame', 'twenty ply', '71612164174417223277'),
+  ('endgame', 'twenty eight ply', '2561115645612642557633422454'),
+  ('endgame', 'thirty two ply', '61522154274432264443723111731767'),
+  ('endgame', 'thirty four ply', '7567436215225157713445144574133123'),
+]
+
+def board(moves):
+  board = connect4.Board()
+  for move in moves:
+    board.play(int(move)-1)
+  return board
+
+# list board for another.py, the side to move is the computer
+def game_state(moves):
+  state = [[0 for x in range(another.BOARD_WIDTH)] for y in range(another.BOARD_HEIGHT)]
+  heights = [0] * another.BOARD_WIDTH
+  for i, move in enumerate(moves):
+    x = int(move)-1
+    heights[x] += 1
+    if (len(moves)-1-i) % 2 == 0:
+      state[another.BOARD_HEIGHT-heights[x]][x] = another.HUMAN_PLAYER
+    else:
+      state[another.BOARD_HEIGHT-heights[x]][x] = another.COMPUTER_PLAYER
+  return state
+
+# iterative deepening MTD(f) of connect4.Board, one entry per finished depth
+def bench_connect4(moves, think, depth):
+  connect4.Board.nodes.clear()
+  depths = []
+  start = time()
+  def report(d, g):
+    depths.append({'depth': d, 'seconds': time() - start, 'nodes': connect4.Board.stats.nodes, 'move': g[1]})
+  move = board(moves).best(think, depth, report)
+  result = summary(depths, move, time() - start)
+  result['stats'] = connect4.Board.stats.as_dict()
+  return result
+
+# another.bestMove has no iterative deepening, every depth is its own
+# search. stats are the deepest search's
+def bench_another(moves, think, depth):
+  depths = []
+  nodes = 0
+  elapsed = 0.0
+  move = None
+  for d in range(1, depth+1):
+    start = time()
+    move = another.bestMove(game_state(moves), another.COMPUTER_PLAYER, another.HUMAN_PLAYER, another.evaluateScoreIncremental, d)
+    elapsed += time() - start
+    nodes += another.searchStats.nodes
+    depths.append({'depth': d, 'seconds': elapsed, 'nodes': nodes, 'move': move})
+    if elapsed > think:
+      break
+  result = summary(depths, move, elapsed)
+  result['stats'] = another.searchStats.as_dict()
+  return result
+
+# seconds and nodes in depths are totals up to and including that depth
+def summary(depths, move, seconds):
+  nodes = depths[-1]['nodes'] if depths else 0
+  return {
+    'move': move,
+    'depth': depths[-1]['depth'] if depths else 0,
+    'nodes': nodes,
+    'seconds': seconds,
+    'nps': nodes / seconds if seconds > 0 else 0.0,
+    'depths': depths,
+  }
+
+# time to finish a fixed depth with Board.best(workers = n) for every n,
+# speedup is relative to the first worker count given. every run starts
+# from a fresh table and ordering, forked workers inherit both
+def bench_speedup(moves, depth, workers):
+  runs = []
+  for n in workers:
+    connect4.Board.nodes = Table(16)
+    connect4.Board.ordering = Ordering()
+    start = time()
+    move = board(moves).best(float('inf'), depth, workers = n)
+    runs.append({'workers': n, 'seconds': time() - start, 'move': move})
+  for run in runs:
+    run['speedup'] = runs[0]['seconds'] / run['seconds'] if run['seconds'] > 0 else 0.0
+  return runs
+
+# exact score of every playable column, for checking the engines' moves
+def column_scores(moves, solver):
+  current, mask, played = solver.position([int(move)-1 for move in moves])
+  scores = {}
+  for x in range(solver.width):
+    move = solver.possible(mask) & solver.columns[x]
+    if not move:
+      continue
+    if solver.winning(current, mask) & move:
+      scores[x] = (solver.cells + 1 - played) // 2
+    else:
+      scores[x] = -solver.solve(current ^ mask, mask | move, played + 1)
+  return scores
+
+ENGINES = {
+  'connect4': bench_connect4,
+  'another': bench_another,
+}
+
+def positions(phases = None):
+  return [position for position in POSITIONS if not phases or position[0] in phases]
+
+# with solve set every move is also checked against perfect play
+def run(engines, think, depth, phases = None, solve = False):
+  results = []
+  solver = Solver() if solve else None
+  for phase, name, moves in positions(phases):
+    scores = column_scores(moves, solver) if solver else None
+    for engine in engines:
+      result = ENGINES[engine](moves, think, depth)
+      result.update({'engine': engine, 'phase': phase, 'position': name, 'moves': moves})
+      if scores:
+        result['score'] = scores.get(result['move'])
+        result['optimal'] = result['score'] == max(scores.values())
+      results.append(result)
+  return results
+
+def speedup(depth, workers, phases = None):
+  results = []
+  for phase, name, moves in positions(phases):
+    results.append({'phase': phase, 'position': name, 'moves': moves, 'depth': depth, 'runs': bench_speedup(moves, depth, workers)})
+  return results
+
+# modules a fresh process imports before it can play, timed in new
+# interpreters with a bare interpreter's startup taken off
+STARTUP = ['connect4', 'another', 'solver', 'tournament']
+
+def import_time(module, repeat):
+  times = []
+  for i in range(repeat):
+    start = time()
+    subprocess.check_call([sys.executable, '-c', 'import ' + module] if module else [sys.executable, '-c', 'pass'])
+    times.append(time() - start)
+  return sorted(times)[len(times) // 2]
+
+def startup(repeat):
+  bare = import_time(None, repeat)
+  results = {'interpreter': bare}
+  for module in STARTUP:
+    results[module] = import_time(module, repeat) - bare
+  return results
+
+def main(argv = None):
+  parser = argparse.ArgumentParser(description = 'benchmark the connect 4 engines on a fixed set of positions')
+  parser.add_argument('--engine', action = 'append', choices = sorted(ENGINES), help = 'engine to run, repeat for several (default: all)')
+  parser.add_argument('--phase', action = 'append', choices = ['opening', 'midgame', 'endgame'], help = 'only run positions from this phase')
+  parser.add_argument('--think', type = float, default = 2, help = 'seconds per position, connect4 scales it by game phase and stops at the deadline')
+  parser.add_argument('--depth', type = int, default = 9, help = 'deepest iteration to run')
+  parser.add_argument('--workers', type = int, action = 'append', help = 'also time connect4 root-parallel search to --depth with this many processes, repeat to compare')
+  parser.add_argument('--solve', action = 'store_true', help = 'score every move against the exact solver, only practical past the opening')
+  parser.add_argument('--startup', type = int, metavar = 'REPEAT', help = 'also time importing the engine modules in fresh processes, median of REPEAT runs')
+  parser.add_argument('--output', help = 'write the JSON report here instead of stdout')
+  args = parser.parse_args(argv)
+  report = {
+    'think': args.think,
+    'max depth': args.depth,
+    'results': run(args.engine or sorted(ENGINES), args.think, args.depth, args.phase, args.solve),
+  }
+  if args.workers:
+    report['speedup'] = speedup(args.depth, args.workers, args.phase)
+  if args.startup:
+    report['startup'] = startup(args.startup)
+  if args.output:
+    with open(args.output, 'w') as output:
+      json.dump(report, output, indent = 2)
+  else:
+    json.dump(report, sys.stdout, indent = 2)
+    sys.stdout.write('\n')
+
+if __name__ == '__main__':
+  main()
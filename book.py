@@ -0,0 +1,186 @@
+import os
+import sys
+import mmap
+import struct
+from time import time
+
+# opening book: the best column for every position up to some ply.
+#
+#   python book.py --ply 4 --depth 6
+#
+# searches every position reachable in at most 4 moves with
+# connect4.Board at depth 6 and writes opening.book next to this file,
+# where connect4.Board.best and another.bestMove look for it. the depth
+# has to be even: the leaf heuristic scores for the side to move at the
+# leaf, so odd depths score for the wrong side and pick edge columns.
+# a book that doesn't play the known openings is not written
+#
+# a position is keyed by current + mask in the Board bitboard layout
+# (current: pieces of the side to move, mask: all pieces), which is
+# unique per position. a position and its mirror image share one entry
+# under the smaller of their two keys. entries are 64 bit words,
+# key << 3 | column, sorted so lookups are a binary search over the
+# memory-mapped file
+PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'opening.book')
+MAGIC = b'C4BK'
+HEADER = struct.Struct('<4sHHQ')
+ENTRY = struct.Struct('<Q')
+# columns perfect play is known to choose, by the moves before them
+KNOWN = {(): 3, (3,): 3}
+
+class Book:
+
+  def __init__(self, mapped, width, height, count):
+    self.mapped = mapped
+    self.width = width
+    self.height = height
+    self.count = count
+
+  # the book at path, None when there is no usable book there
+  @classmethod
+  def open(cls, path = PATH):
+    try:
+      with open(path, 'rb') as stored:
+        magic, width, height, count = HEADER.unpack(stored.read(HEADER.size))
+        if magic != MAGIC or os.fstat(stored.fileno()).st_size != HEADER.size + ENTRY.size * count:
+          return None
+        if not count:
+          return cls(None, width, height, 0)
+        mapped = mmap.mmap(stored.fileno(), 0, access = mmap.ACCESS_READ)
+    except (IOError, OSError, struct.error):
+      return None
+    return cls(mapped, width, height, count)
+
+  def __len__(self):
+    return self.count
+
+  # book column for the position, or None
+  def move(self, current, mask, width = 7, height = 6):
+    if not self.count or (width, height) != (self.width, self.height):
+      return None
+    key = current + mask
+    mirrored = mirror(current, width, height) + mirror(mask, width, height)
+    entry = find(self.mapped, HEADER.size, self.count, min(key, mirrored), 3)
+    if entry is None:
+      return None
+    column = entry & 7
+    return column if key <= mirrored else width-1-column
+
+# binary search of count sorted 64 bit entries starting at offset in
+# mapped, for the entry whose top bits above shift are target
+def find(mapped, offset, count, target, shift):
+  low, high = 0, count
+  while low < high:
+    middle = (low + high) // 2
+    entry = ENTRY.unpack_from(mapped, offset + ENTRY.size * middle)[0]
+    if entry >> shift < target:
+      low = middle + 1
+    elif entry >> shift > target:
+      high = middle
+    else:
+      return entry
+  return None
+
+# bitboard with its columns in reverse order
+def mirror(bits, width = 7, height = 6):
+  column = (1 << (height+1)) - 1
+  mirrored = 0
+  for x in range(width):
+    mirrored |= ((bits >> x*(height+1)) & column) << (width-1-x)*(height+1)
+  return mirrored
+
+# canonical key and whether it is the mirrored one, for a Board
+def key(board):
+  current = board.bits[board.player]
+  mask = board.bits[board.player] | board.bits[board.opponent]
+  mirrored = mirror(current, board.width, board.height) + mirror(mask, board.width, board.height)
+  return min(current + mask, mirrored), mirrored < current + mask
+
+# every position reachable in at most ply moves that still needs a
+# move, one per mirror pair, as the list of columns that reaches it
+def positions(ply):
+  import connect4
+  found = {}
+  layer = [connect4.Board()]
+  for p in range(ply+1):
+    following = []
+    for board in layer:
+      canonical = key(board)[0]
+      if canonical in found:
+        continue
+      found[canonical] = list(board.history)
+      if p < ply:
+        for x in board.columns():
+          child = board.move(x)
+          if not child.won() and not child.tied():
+            following.append(child)
+    layer = following
+  return list(found.values())
+
+# best column for the position reached by history, searched to depth.
+# every position starts from an empty table and ordering, the table's
+# scores are only good for searches with the same side to move
+def search(history, depth):
+  import connect4
+  from transposition import Table
+  from ordering import Ordering
+  # the book being rebuilt must not answer for itself
+  connect4.Board.book = None
+  connect4.Board.nodes = Table(16)
+  connect4.Board.ordering = Ordering()
+  board = connect4.Board()
+  for x in history:
+    board.play(x)
+  return board.best(float('inf'), depth)
+
+def build(ply, depth, workers = None, path = PATH):
+  import connect4
+  if depth % 2:
+    raise ValueError('book depth must be even: {0}'.format(depth))
+  histories = positions(ply)
+  if workers and workers > 1:
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(workers) as pool:
+      moves = list(pool.map(search, histories, [depth] * len(histories)))
+  else:
+    moves = [search(history, depth) for history in histories]
+  for history, move in zip(histories, moves):
+    known = KNOWN.get(tuple(history))
+    if known is not None and move != known:
+      raise ValueError('book plays {0} after {1}, not {2}'.format(move, history, known))
+  entries = {}
+  for history, move in zip(histories, moves):
+    if move is None:
+      continue
+    board = connect4.Board()
+    for x in history:
+      board.play(x)
+    canonical, flipped = key(board)
+    entries[canonical] = canonical << 3 | (board.width-1-move if flipped else move)
+  temporary = path + '.tmp'
+  with open(temporary, 'wb') as stored:
+    stored.write(HEADER.pack(MAGIC, connect4.Board().width, connect4.Board().height, len(entries)))
+    for canonical in sorted(entries):
+      stored.write(ENTRY.pack(entries[canonical]))
+  os.replace(temporary, path)
+  return len(entries)
+
+def main(argv = None):
+  import argparse
+  parser = argparse.ArgumentParser(description = 'build the opening book')
+  parser.add_argument('--ply', type = int, default = 4, help = 'include positions up to this many moves in')
+  parser.add_argument('--depth', type = int, default = 6, help = 'search depth for every position, even')
+  parser.add_argument('--workers', type = int, help = 'search positions in this many processes')
+  parser.add_argument('--output', default = PATH, help = 'book file to write')
+  args = parser.parse_args(argv)
+  if args.depth % 2:
+    parser.error('--depth must be even')
+  start = time()
+  try:
+    count = build(args.ply, args.depth, args.workers, args.output)
+  except ValueError as error:
+    sys.exit(str(error))
+  sys.stderr.write('{0} positions in {1:.1f}s\n'.format(count, time() - start))
+
+if __name__ == '__main__':
+  main()
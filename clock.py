@@ -0,0 +1,70 @@
+from time import time
+
+class Timeout(Exception):
+  pass
+
+# time manager for iterative deepening. the next iteration only starts
+# when its predicted cost, the last iteration's time times the observed
+# branching factor, still fits the budget, and the search itself checks
+# the deadline every few nodes so an iteration that runs long is cut off
+# at the budget instead of finishing. the first iteration always
+# finishes so there is a move to play, unless the clock starts armed
+# for a search that has nothing to fall back on, like the solver's.
+# stopped, when given, is asked at every check and ends the search at
+# once, first iteration or not, when it says the result is not wanted
+class Clock:
+
+  # branching factor assumed until two iterations took measurable time
+  BRANCHING = 4.0
+  # nodes between deadline checks, a power of two minus one
+  INTERVAL = 1023
+
+  def __init__(self, budget, armed = False, stopped = None):
+    self.budget = budget
+    self.stopped = stopped
+    self.start = time()
+    self.deadline = self.start + budget
+    self.times = []
+    self.armed = armed
+
+  def elapsed(self):
+    return time() - self.start
+
+  # an iteration just finished
+  def iteration(self):
+    self.times.append(self.elapsed() - sum(self.times))
+    self.armed = True
+
+  # growth from one iteration to the next, mean of the last two ratios
+  def branching(self):
+    ratios = [b / a for a, b in zip(self.times, self.times[1:]) if a > 0.001]
+    if not ratios:
+      return self.BRANCHING
+    ratios = ratios[-2:]
+    return min(max(sum(ratios) / len(ratios), 1.0), 16.0)
+
+  def predict(self):
+    return self.times[-1] * self.branching() if self.times else 0.0
+
+  # whether the next iteration is expected to finish in time
+  def next(self):
+    return self.elapsed() + self.predict() <= self.budget
+
+  # called from the search, raises Timeout past the deadline or once
+  # the search was stopped
+  def check(self):
+    if self.stopped and self.stopped():
+      raise Timeout()
+    if self.armed and time() > self.deadline:
+      raise Timeout()
+
+# seconds to spend on a move out of think, by game phase: the opening
+# is mostly theory and settles little, the middle game decides the game
+# and the endgame shrinks with the board until the solver takes over
+def allot(think, moves, cells = 42):
+  empty = cells - moves
+  if moves < 6:
+    return think * 0.5
+  if empty > 20:
+    return think * 1.25
+  return think * max(0.25, empty / 20.0)
@@ -1,10 +1,42 @@
-from tkinter import Tk, Button, Frame, Canvas, font
-from copy import deepcopy
-from time import time
+import os
+from random import Random
+from transposition import Table
+from ordering import Ordering
+from book import Book
+from solver import Solver, distance
+from tablebase import Tablebase, reaches, probe
+from clock import Clock, Timeout, allot
+from stats import Stats
+from profiling import profiled
+from evaluation import Heuristic
+import windows
+from worker import Worker
+ 
+# zobrist keys, one random 64 bit number per player and cell. built once
+# per board geometry with a fixed seed so hashes are stable between runs
+_zobrist = {}
+ 
+def zobrist(width, height, players = ('X', 'O')):
+  if (width, height) not in _zobrist:
+    rng = Random(width*height)
+    _zobrist[width, height] = dict((player, [[rng.getrandbits(64) for y in range(height)] for x in range(width)]) for player in players)
+  return _zobrist[width, height]
  
 class Board:
  
-  nodes = {}
+  # transposition table shared by every board, capped at a fixed size
+  nodes = Table(16)
+  # move ordering used by the search, swap in another Ordering to compare.
+  # its killers and history are cleared when a search starts
+  ordering = Ordering()
+  # counters of the last search, see stats.Stats
+  stats = Stats()
+  # opening book checked before searching, None when there is none
+  book = Book.open()
+  # exact solver shared by every board, made on first use
+  solver = None
+  # endgame tablebase, positions this close to the end are played exactly
+  endgame = Tablebase.open()
  
   def __init__(self, other = None):
     self.player = 'X'
@@ -12,167 +44,162 @@ class Board:
     self.empty = '.'
     self.width = 7
     self.height = 6
-    self.fields = {}
-    for y in range(self.height):
-      for x in range(self.width):
-        self.fields[x, y] = self.empty
+    # bitboards, one integer mask per player. column x owns bits
+    # x*(height+1) .. x*(height+1)+height-1, the bit above every column
+    # is a sentinel row that is never set so shifts can't wrap columns
+    self.bits = {self.player: 0, self.opponent: 0}
+    self.heights = [0] * self.width
+    self.count = 0
+    self.history = []
+    # position hash and the hash of its left-right mirror image
+    self.keys = zobrist(self.width, self.height)
+    self.windows = windows.table(self.width, self.height)
+    self.hash = 0
+    self.mirrored = 0
+    # heuristic score kept up to date by play and undo
+    self.evaluation = Heuristic(self.width, self.height, (self.player, self.opponent))
+    self.__fields = None
+    # time manager of the search in progress
+    self.__clock = None
     # copy constructor
     if other:
-      self.__dict__ = deepcopy(other.__dict__)
+      self.player, self.opponent = other.player, other.opponent
+      self.bits = dict(other.bits)
+      self.heights = list(other.heights)
+      self.count = other.count
+      self.history = list(other.history)
+      self.hash = other.hash
+      self.mirrored = other.mirrored
+      self.evaluation = other.evaluation.copy()
+ 
+  # (x, y) -> 'X'/'O'/'.' view of the bitboards, used by the gui and heuristic
+  @property
+  def fields(self):
+    if self.__fields is None:
+      self.__fields = {}
+      for y in range(self.height):
+        for x in range(self.width):
+          self.__fields[x, y] = self.empty
+          for player in self.bits:
+            if self.bits[player] & self.__bit(x, y):
+              self.__fields[x, y] = player
+    return self.__fields
  
+  def __bit(self, x, y):
+    return 1 << (x*(self.height+1) + y)
+ 
+  # column x as seen on the mirrored board
+  def __flip(self, x):
+    return None if x is None else self.width-1-x
+ 
+  # columns that still have room
+  def columns(self):
+    return [x for x in range(self.width) if self.heights[x] < self.height]
+ 
+  # returns a new board with the move applied, self is left untouched
   def move(self, x):
     board = Board(self)
-    for y in range(board.height):
-      if board.fields[x, y] == board.empty:
-        board.fields[x, y] = board.player
-        break
-    board.player, board.opponent = board.opponent, board.player
+    board.play(x)
     return board
  
-  def __heuristic(self, score, positions):
-    score1 = score(self.player, winalg = self.__winlines, pos = positions)
-    score2 = score(self.opponent, winalg = self.__winlines, pos = positions)
-
-    return score1 - score2
- 
-  def __heuristic_score(self, player, winalg, pos):
-    lines = winalg(player)
-    winpositions = pos(lines,player, winalg)
-    score = 0
-    for x in range(self.width):
-      for y in range(self.height-1,0,-1):
-        win = winpositions.get("{0},{1}".format(x, y),False)
-        below = winpositions.get("{0},{1}".format(x, y-1),False)
-        if win and below:
-          score+=self.height-y*100
-    for line in lines:
-      pieces = 0
-      height = []
-      for x, y in line:
-        if self.fields[x, y] == player:
-          pieces = pieces + 1
-        elif self.fields[x, y] == self.empty:
-          height.append(y)
-      heightscore = self.height - int(sum(height) / float(len(height)))
-      score = score+pieces*heightscore
-    return score
- 
-  def __winpositions(self, lines, player, win):
-    lines = win(player)
-    winpositions = {}
-    for line in lines:
-      pieces = 0
-      empty = None
-      for x, y in line:
-        if self.fields[x, y] == player:
-          pieces += 1
-        elif self.fields[x, y] == self.empty:
-          if not empty == None:
-            break
-          empty = (x,y)
-      if pieces == 3:
-        winpositions["{0},{1}".format(x,y)] = True
-    return winpositions
- 
-  # find routes for winning lines
-  def __winlines(self, player):
-    lines = []
-    # horizontal
-    for y in range(self.height):
-      winning = []
-      for x in range(self.width):
-        if self.fields[x, y] == player or self.fields[x, y] == self.empty:
-          winning.append((x,y))
-          if len(winning) >= 4:
-            lines.append(winning[-4:])
-        else:
-          winning = []
-    # vertical
-    for x in range(self.width):
-      winning = []
-      for y in range(self.height):
-        if self.fields[x,y] == player or self.fields[x, y] == self.empty:
-          winning.append((x, y))
-          if len(winning) >= 4:
-            lines.append(winning[-4:])
-        else:
-          winning = []
-    # diagonal
-    winning = []
-    for cx in range(self.width-1):
-      sx, sy = max(cx-2, 0),abs(min(cx-2, 0))
-      winning = []
-      for cy in range(self.height):
-        x, y = sx+cy, sy+cy
-        if x < 0 or y < 0 or x >= self.width or y >= self.height:
-          continue
-        if self.fields[x, y] == player or self.fields[x, y] == self.empty:
-          winning.append((x, y))
-          if len(winning) >= 4:
-            lines.append(winning[-4:])
-        else:
-          winning = []
-    # other diagonal
-    winning = []
-    for cx in range(self.width-1):
-      sx, sy = self.width-1-max(cx-2, 0),abs(min(cx-2, 0))
-      winning = []
-      for cy in range(self.height):
-        x, y = sx - cy, sy + cy
-        if x < 0 or y < 0 or x >= self.width or y >= self.height:
-          continue
-        if self.fields[x, y] == player or self.fields[x, y] == self.empty:
-          winning.append((x, y))
-          if len(winning) >= 4:
-            lines.append(winning[-4:])
-        else:
-          winning = []
-    # return
-    return lines
+  # in-place make/unmake used by the search, history is the move stack
+  def play(self, x):
+    self.hash ^= self.keys[self.player][x][self.heights[x]]
+    self.mirrored ^= self.keys[self.player][self.width-1-x][self.heights[x]]
+    self.bits[self.player] |= self.__bit(x, self.heights[x])
+    self.evaluation.place(self.player, x, self.heights[x])
+    self.heights[x] += 1
+    self.count += 1
+    self.history.append(x)
+    self.player, self.opponent = self.opponent, self.player
+    self.__fields = None
+ 
+  def undo(self):
+    x = self.history.pop()
+    self.player, self.opponent = self.opponent, self.player
+    self.heights[x] -= 1
+    self.count -= 1
+    self.bits[self.player] &= ~self.__bit(x, self.heights[x])
+    self.evaluation.remove(self.player, x, self.heights[x])
+    self.hash ^= self.keys[self.player][x][self.heights[x]]
+    self.mirrored ^= self.keys[self.player][self.width-1-x][self.heights[x]]
+    self.__fields = None
  
   # gives ai time to think, wider range = more time to think
-  def __iterative_deepening(self, think, prune):
+  # report(depth, result) is called after every finished iteration.
+  # an iteration that would overrun think is not started or is cut off,
+  # the last finished one counts. depth defaults to the empty cells left.
+  # once stopped() is true the search ends within Clock.INTERVAL nodes
+  def __iterative_deepening(self, think, prune, depth = None, report = None, stopped = None):
     g = (3,None)
-    start = time()
-    for d in range(1,10):
-      g = prune(g, d)
-      if time() - start > think:
-        break
+    limit = self.width * self.height - self.count
+    depth = limit if depth is None else min(depth, limit)
+    count = self.count
+    self.__clock = Clock(think, stopped = stopped)
+    try:
+      for d in range(1,depth+1):
+        g = prune(g, d)
+        self.__clock.iteration()
+        Board.stats.iteration(d)
+        if report:
+          report(d, g)
+        if not self.__clock.next():
+          break
+    except Timeout:
+      # unwind the moves the interrupted search still had on the board
+      while self.count > count:
+        self.undo()
+    finally:
+      self.__clock = None
     return g
  
   # bounds are random, abstractively infinity.
+  # g is the previous iteration's (score, move), its score is the first
+  # guess. the move comes from the pass that raised the lower bound to
+  # the final score, passes that fail low don't know a move
   def __mtdf(self, g, d):
     upperBound = +1000
     lowerBound = -1000
-    best = g
+    move = g[1]
     while lowerBound < upperBound:
       if g[0] == lowerBound:
         beta = g[0]+1
       else:
         beta = g[0]
       g = self.__minimax(True, d, beta-1, beta)
-      if g[1] != None:
-        best = g
+      Board.stats.passes += 1
       if g[0] < beta:
         upperBound = g[0]
       else:
         lowerBound = g[0]
-    return best
+        if g[1] != None:
+          move = g[1]
+    return (lowerBound, move)
  
   # recursive function that is a wide search window. 
   # alpha-beta pruning: keeps best and worse values (min-max)
   # bounds are random, abstractively infinity.
   def __minimax(self, player, depth, alpha, beta):
-    lower = Board.nodes.get(str(self)+str(depth)+'lower', None)
-    upper = Board.nodes.get(str(self)+str(depth)+'upper', None)
+    stats = Board.stats
+    stats.nodes += 1
+    if self.__clock and not stats.nodes & Clock.INTERVAL:
+      self.__clock.check()
+    stats.probes += 1
+    lower, upper, move = Board.nodes.probe(self.hash, depth)
+    if lower != None or upper != None:
+      stats.hits += 1
     if lower != None:
       if lower >= beta:
-        return (lower, None)
+        return (lower, move)
       alpha = max(alpha,lower)
     if upper != None:
       if upper <= alpha:
         return (upper, None)
-      beta = max(beta, upper)
+      beta = min(beta, upper)
+    # bounds only hold for this depth, the best move of any depth is
+    # still the one to try first
+    if move == None:
+      move = Board.nodes.hint(self.hash)
     if self.won():
       if player:
         return (-999, None)
@@ -181,109 +208,173 @@ class Board:
     elif self.tied():
       return (0, None)
     elif depth == 0:
-      return (self.__heuristic(self.__heuristic_score, self.__winpositions), None)
+      stats.leaves += 1
+      return (self.evaluation.score(self.player), None)
     elif player:
       best = (alpha, None)
-      for x in range(self.width):
-        if self.fields[x, self.height-1] == self.empty:
-          value = self.move(x).__minimax(not player, depth-1, best[0], beta)[0]
-          if value > best[0]:
-            best = value, x
-          if value > beta:
-            break
+      ply = len(self.history)
+      for i, x in enumerate(Board.ordering.order(self.player, self.columns(), ply, move)):
+        self.play(x)
+        value = self.__minimax(not player, depth-1, best[0], beta)[0]
+        self.undo()
+        if value > best[0]:
+          best = value, x
+        if value >= beta:
+          Board.ordering.cutoff(self.player, x, ply, depth, i)
+          stats.cutoff(depth)
+          break
     else:
       best = (beta, None)
-      for x in range(self.width):
-        if self.fields[x, self.height-1] == self.empty:
-          value = self.move(x).__minimax(not player, depth-1, alpha, best[0])[0]
-          if value<best[0]:
-            best = value,x
-          if alpha>value:
-            break
+      ply = len(self.history)
+      for i, x in enumerate(Board.ordering.order(self.player, self.columns(), ply, move)):
+        self.play(x)
+        value = self.__minimax(not player, depth-1, alpha, best[0])[0]
+        self.undo()
+        if value<best[0]:
+          best = value,x
+        if value <= alpha:
+          Board.ordering.cutoff(self.player, x, ply, depth, i)
+          stats.cutoff(depth)
+          break
     if best[0] <= alpha:
-      Board.nodes[str(self)+str(depth)+"upper"] = best[0]
-      Board.nodes[self.__mirror()+str(depth)+"upper"] = best[0]
+      Board.nodes.store(self.hash, depth, upper = best[0], move = best[1])
+      Board.nodes.store(self.mirrored, depth, upper = best[0], move = self.__flip(best[1]))
+      stats.stores += 1
     elif best[0] >= beta:
-      Board.nodes[str(self)+str(depth)+"lower"] = best[0]
-      Board.nodes[self.__mirror()+str(depth)+"lower"] = best[0]
+      Board.nodes.store(self.hash, depth, lower = best[0], move = best[1])
+      Board.nodes.store(self.mirrored, depth, lower = best[0], move = self.__flip(best[1]))
+      stats.stores += 1
     return best
  
   # calls alpha-beta pruning min max algorithm (__mtdf) 
   # given time to think (__iterative_deepening)
   # to get the best
-  def best(self):
-    return self.__iterative_deepening(2, self.__mtdf,)[1]
+  # with workers set the root moves are searched in that many processes
+  # book and endgame positions are answered without searching.
+  # think is scaled by game phase, see clock.allot, and depth only
+  # caps the search, which otherwise goes as deep as time allows.
+  # stopped() ends the search early, see __iterative_deepening.
+  # what the search did is left in Board.stats
+  @profiled('best')
+  def best(self, think = 2, depth = None, report = None, workers = None, stopped = None):
+    Board.stats = Stats()
+    Board.ordering.clear()
+    x = self.__best(think, depth, report, workers, stopped)
+    Board.stats.order(Board.ordering)
+    Board.stats.stop()
+    return x
+ 
+  def __best(self, think, depth, report, workers, stopped):
+    current = self.bits[self.player]
+    mask = current | self.bits[self.opponent]
+    x = self.opening()
+    if x is not None:
+      Board.stats.source = 'book'
+      return x
+    if reaches(Board.endgame, self.width * self.height, self.count):
+      exact = probe(Board.endgame, self.__solver(), current, mask, self.count)
+      if exact:
+        Board.stats.source = 'endgame'
+        return exact[0]
+    Board.nodes.age()
+    think = allot(think, self.count, self.width * self.height)
+    if workers:
+      return self.__root_parallel(think, depth, report, workers)
+    return self.__iterative_deepening(think, self.__mtdf, depth, report, stopped)[1]
+ 
+  # the opening book's column for this position, or None
+  def opening(self):
+    if not Board.book:
+      return None
+    current = self.bits[self.player]
+    mask = current | self.bits[self.opponent]
+    x = Board.book.move(current, mask, self.width, self.height)
+    return x if x in self.columns() else None
+ 
+  # every root move is searched in its own process with its own table.
+  # the move with the best score at the deepest depth that all of them
+  # finished is played, ties go to the most central column, so the pick
+  # only depends on the scores and not on which process finished first
+  def __root_parallel(self, think, depth, report, workers):
+    columns = Board.ordering.static()
+    columns = [x for x in columns if x in self.columns()]
+    for x in columns:
+      if self.move(x).won():
+        return x
+    # root moves are shared out in rounds, split the budget between them
+    rounds = -(-len(columns) // workers)
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(workers) as pool:
+      futures = [pool.submit(search_reply, self.history, x, think / float(rounds), depth) for x in columns]
+      scores = []
+      for future in futures:
+        score, stats = future.result()
+        scores.append(score)
+        Board.stats.merge(stats)
+    best = (None, None)
+    for d in range(min(len(score) for score in scores)):
+      best = (None, None)
+      for x, score in zip(columns, scores):
+        if best[0] is None or score[d] > best[0]:
+          best = (score[d], x)
+      Board.stats.depth = d+1
+      if report:
+        report(d+1, best)
+    return best[1]
+ 
+  # perfect play: (column, score, distance). score is positive when the
+  # side to move wins, see solver.Solver, distance counts the moves left
+  # until the game ends. report(passes, (lower, upper)) follows the
+  # window closing in on the score. early positions take far too long
+  # to solve, with think set clock.Timeout is raised after that long,
+  # and with stopped given as soon as stopped() is true
+  @profiled('solve')
+  def solve(self, report = None, think = None, stopped = None):
+    current = self.bits[self.player]
+    mask = current | self.bits[self.opponent]
+    x, score = self.__solver().best(current, mask, self.count, report, think, stopped)
+    return x, score, distance(score, self.count, self.width, self.height)
+ 
+  def __solver(self):
+    if Board.solver is None:
+      Board.solver = Solver(self.width, self.height)
+    return Board.solver
+ 
+  # scores of this position for the side that just moved, one for each
+  # finished iteration. root depth d is depth d-1 below the root move
+  @profiled('reply')
+  def reply_scores(self, think, depth):
+    Board.nodes.age()
+    Board.stats = Stats()
+    Board.ordering.clear()
+    scores = []
+    search = lambda g, d: self.__minimax(False, d-1, -1000, +1000)
+    self.__iterative_deepening(think, search, depth, lambda d, g: scores.append(g[0]))
+    Board.stats.order(Board.ordering)
+    return scores
  
   # if all slots are not empty, then the game is tied
   def tied(self):
-    for (x, y) in self.fields:
-      if self.fields[x, y] == self.empty:
-        return False
-    return True
+    return self.count == self.width * self.height
  
   # check if someone has won (length of list is 4)
+  # only the last piece played can complete a line, so look through it
   def won(self):
-    # horizontal
-    for y in range(self.height):
-      winning = []
-      for x in range(self.width):
-        if self.fields[x, y] == self.opponent:
-          winning.append((x, y))
-          if len(winning) == 4:
-            return winning
-        else:
-          winning = []
-    # vertical
-    for x in range(self.width):
-      winning = []
-      for y in range(self.height):
-        if self.fields[x, y] == self.opponent:
-          winning.append((x, y))
-          if len(winning) == 4:
-            return winning
-        else:
-          winning = []
-    # diagonal
-    winning = []
-    for cx in range(self.width-1):
-      sx, sy = max(cx-2,0), abs(min(cx-2, 0))
-      winning = []
-      for cy in range(self.height):
-        x, y = sx + cy, sy + cy
-        if x < 0 or y < 0 or x >= self.width or y >= self.height:
-          continue
-        if self.fields[x,y] == self.opponent:
-          winning.append((x,y))
-          if len(winning) == 4:
-            return winning
-        else:
-          winning = []
-    # other diagonal
-    winning = []
-    for cx in range(self.width-1):
-      sx, sy = self.width - 1 - max(cx - 2, 0), abs(min(cx-2, 0))
-      winning = []
-      for cy in range(self.height):
-        x,y = sx-cy,sy+cy
-        if x<0 or y<0 or x>=self.width or y>=self.height:
-          continue
-        if self.fields[x, y] == self.opponent:
-          winning.append((x,y))
-          if len(winning) == 4:
-            return winning
-        else:
-          winning = []
+    if not self.history:
+      return None
+    x = self.history[-1]
+    return self.won_at(x, self.heights[x]-1)
+ 
+  # lines of 4 through (x, y) for whoever owns that cell,
+  # only the precomputed windows through the cell are tested
+  def won_at(self, x, y):
+    for bits in self.bits.values():
+      for line in self.windows.through[x, y]:
+        if bits & self.windows.masks[line] == self.windows.masks[line]:
+          return self.windows.cells[line]
     # default
     return None
  
-  def __mirror(self):
-    string = ''
-    for y in range(self.height):
-      for x in range(self.width):
-        string += ' ' + self.fields[self.width-1-x, self.height-1-y]
-      string += "\n"
-    return string
- 
   def __str__(self):
     string = ''
     for y in range(self.height):
@@ -292,9 +383,30 @@ class Board:
       string += "\n"
     return string
  
+# process pool entry point for Board.best(workers = n), the reply's
+# scores and the stats of searching them
+def search_reply(history, x, think, depth):
+  board = Board()
+  for move in history:
+    board.play(move)
+  board.play(x)
+  scores = board.reply_scores(think, depth)
+  return scores, Board.stats
+ 
 class GUI:
  
-  def __init__(self):
+  # seconds the perfect ai tries to solve a position before searching it
+  PERFECT = 2
+ 
+  # with ponder on the ai searches the human's possible moves while
+  # waiting for input. with a table path the transposition table is
+  # loaded from that file and saved back to it on close. with perfect
+  # on the ai solves every position it can solve in time and searches
+  # the rest. it doesn't ponder then, solving the replies would only
+  # hold up the solve that matters
+  def __init__(self, ponder = True, table = None, perfect = False):
+    # imported here so the engine loads without tkinter
+    from tkinter import Tk, Button, Frame, Canvas, font
     self.app = Tk()
     self.app.title('Connect4')
     self.app.resizable(width=False, height=False)
@@ -315,22 +427,100 @@ class GUI:
     handler = lambda: self.reset() #lambda
     self.restart = Button(self.app, command = handler, text = 'reset')
     self.restart.grid(row = 2, column = 0, columnspan = self.board.width, sticky = "WE")
+    # the ai searches in a background thread so the window stays live
+    self.worker = Worker(self.app)
+    self.app.protocol('WM_DELETE_WINDOW', self.close)
+    self.pondering = ponder and not perfect
+    self.perfect = perfect
+    self.pondered = {}
+    self.table = table
+    if table:
+      Board.nodes = Table.load(table)
     self.update()
+    self.ponder()
  
   def reset(self):
+    self.worker.cancel()
+    self.app.title('Connect4')
+    self.app.config(cursor="")
     self.board = Board()
     self.update()
+    self.ponder()
+ 
+  def close(self):
+    self.worker.cancel()
+    if self.table:
+      Board.nodes.save(self.table)
+    self.app.destroy()
  
   def move(self, x):
-    self.app.config(cursor = "watch")
-    self.app.update()
     self.board = self.board.move(x)
     self.update()
-    move = self.board.best()
+    if self.board.won() or self.board.tied():
+      self.worker.cancel()
+      return
+    # answered while pondering, no search needed
+    if x in self.pondered:
+      self.worker.cancel()
+      self.answer(self.pondered[x])
+      return
+    self.app.config(cursor = "watch")
+    for x in range(self.board.width):
+      self.buttons[x]['state'] = 'disabled'
+    # search a copy, the gui keeps drawing self.board meanwhile.
+    # if pondering was cut short the shared table is already warm
+    board = Board(self.board)
+    self.worker.start(lambda report: self.search(board, report), self.answer, self.thinking)
+ 
+  # in perfect mode the book answers first, then the solver gets
+  # PERFECT seconds and the usual search takes over if that runs out.
+  # a search the worker has dropped stops within a few nodes
+  def search(self, board, report):
+    stopped = self.worker.cancelled
+    if self.perfect and board.opening() is None:
+      try:
+        return board.solve(lambda passes, window: report(passes, window, True), self.PERFECT, stopped)[0]
+      except Timeout:
+        if stopped():
+          return None
+    return board.best(report = report, stopped = stopped)
+ 
+  # progress from the search, depth is the iteration that just finished.
+  # the solver reports its passes and the window left for the score
+  def thinking(self, depth, result, solving = False):
+    if solving:
+      self.app.title('Connect4 - solving, score {0} to {1}'.format(*result))
+    else:
+      self.app.title('Connect4 - thinking, depth {0}'.format(depth))
+ 
+  def answer(self, move):
     if move != None:
       self.board = self.board.move(move)
-      self.update()
+    self.app.title('Connect4')
     self.app.config(cursor="")
+    self.update()
+    self.ponder()
+ 
+  # search every reply the human can make, center first, each for the
+  # usual think time. all of them share Board.nodes so even unfinished
+  # replies leave a warm table behind for the real search
+  def ponder(self):
+    self.pondered = {}
+    if not self.pondering or self.board.won() or self.board.tied():
+      return
+    board = Board(self.board)
+    def search(report):
+      for x in Board.ordering.static():
+        if x in board.columns():
+          reply = board.move(x)
+          if not reply.won() and not reply.tied():
+            move = self.search(reply, lambda d, g: report(x, d, None, False))
+            report(x, None, move, True)
+    self.worker.start(search, lambda result: None, self.pondered_reply)
+ 
+  def pondered_reply(self, x, depth, move, finished):
+    if finished:
+      self.pondered[x] = move
  
   def update(self):
     for (x,y) in self.board.fields:
@@ -357,4 +547,4 @@ class GUI:
     self.app.mainloop()
  
 if __name__ == '__main__':
-  GUI().mainloop()
+  GUI(table = os.environ.get('CONNECT4_TABLE'), perfect = bool(os.environ.get('CONNECT4_PERFECT'))).mainloop()
@@ -0,0 +1,201 @@
+import windows
+
+# evaluations kept up to date while the search makes and unmakes moves,
+# so a leaf reads the score instead of rescanning the board. every
+# window keeps its state in one integer, both players' piece counts
+# and the sum of the empty cells (5 * 5 possible counts per window):
+#
+#   state = mine + 5 * theirs + 25 * empty sum
+#
+# placing or removing a piece adds or subtracts a fixed step for every
+# window through its cell, and per-state tables say what a window is
+# worth, so each move costs a handful of lookups per window
+INF = float('inf')
+# per-state tables, built once per board geometry
+_tables = {}
+
+# the connect4.Board heuristic kept incrementally. for each player the
+# score is the sum over windows without an opposing piece of pieces *
+# (height - mean height of the empty cells), plus height - 100y for
+# every cell (x, y) that, together with (x, y-1), is the last cell of
+# a window holding three of the player's pieces and no opposing one
+class Heuristic:
+
+  def __init__(self, width = 7, height = 6, players = ('X', 'O'), other = None):
+    self.width = width
+    self.height = height
+    self.players = players
+    table = windows.table(width, height)
+    if other:
+      self.state = list(other.state)
+      self.refs = [list(refs) for refs in other.refs]
+      self.line = list(other.line)
+      self.pairs = list(other.pairs)
+      self.tables = other.tables
+      self.through = other.through
+      self.last = other.last
+      return
+    # windows start empty, so their empty sum is the sum of their heights
+    self.state = [25 * sum(y for x, y in cells) for cells in table.cells]
+    self.last = [cells[-1][0] * height + cells[-1][1] for cells in table.cells]
+    self.through = [[table.through[x, y] for y in range(height)] for x in range(width)]
+    self.refs = [[0] * (width * height) for player in players]
+    self.line = [0, 0]
+    self.pairs = [0, 0]
+    if ('heuristic', width, height) not in _tables:
+      _tables['heuristic', width, height] = self.__tables()
+    self.tables = _tables['heuristic', width, height]
+
+  # line value and whether the window counts for the pair term, per
+  # player and state
+  def __tables(self):
+    size = 5 + 5*5 + 25 * 4 * (self.height - 1) + 1
+    values = ([0] * size, [0] * size)
+    threes = ([False] * size, [False] * size)
+    for state in range(size):
+      counts = (state % 5, state // 5 % 5)
+      empty = state // 25
+      for p in (0, 1):
+        mine, theirs = counts[p], counts[1-p]
+        if theirs or not 0 < mine < 4:
+          continue
+        values[p][state] = mine * (self.height - empty // (4 - mine))
+        threes[p][state] = mine == 3
+    return values, threes
+
+  def copy(self):
+    return Heuristic(self.width, self.height, self.players, self)
+
+  def place(self, player, x, y):
+    self.__update(player, x, y, 1)
+
+  def remove(self, player, x, y):
+    self.__update(player, x, y, -1)
+
+  def __update(self, player, x, y, sign):
+    step = sign * ((1 if player == self.players[0] else 5) - 25 * y)
+    state = self.state
+    (values0, values1), (threes0, threes1) = self.tables
+    line = self.line
+    for w in self.through[x][y]:
+      old = state[w]
+      new = old + step
+      state[w] = new
+      line[0] += values0[new] - values0[old]
+      line[1] += values1[new] - values1[old]
+      if threes0[new] != threes0[old]:
+        self.__count(0, self.last[w], 1 if threes0[new] else -1)
+      if threes1[new] != threes1[old]:
+        self.__count(1, self.last[w], 1 if threes1[new] else -1)
+
+  # a window with three pieces ending in cell came or went
+  def __count(self, p, cell, change):
+    refs = self.refs[p]
+    before = refs[cell] > 0
+    refs[cell] += change
+    if before == (refs[cell] > 0):
+      return
+    sign = 1 if not before else -1
+    y = cell % self.height
+    if y > 0 and refs[cell-1] > 0:
+      self.pairs[p] += sign * (self.height - y*100)
+    if y < self.height-1 and refs[cell+1] > 0:
+      self.pairs[p] += sign * (self.height - (y+1)*100)
+
+  # score of player minus the score of the other player
+  def score(self, player):
+    p = 0 if player == self.players[0] else 1
+    return self.line[p] + self.pairs[p] - self.line[1-p] - self.pairs[1-p]
+
+# another.evaluateScore kept incrementally. an empty cell scores a point
+# per direction for each player that has three pieces in a window of
+# that direction through it, and a finished line scores infinity for
+# its owner, the human's first as in checkWin. cells are (row, column)
+# with row 0 at the top, pieces are 1 for the computer, -1 for the human
+class Threats:
+
+  def __init__(self, gameState, width = 7, height = 6, computer = 1, human = -1):
+    self.width = width
+    self.height = height
+    self.computer = computer
+    self.human = human
+    table = windows.table(width, height)
+    # flat cell index is row * width + column
+    flat = lambda cell: (height - 1 - cell[1]) * width + cell[0]
+    self.state = [25 * sum(flat(cell) for cell in cells) for cells in table.cells]
+    self.directions = table.directions
+    self.through = [[table.through[column, height - 1 - row] for column in range(width)] for row in range(height)]
+    # (cell * 4 + direction) -> windows with three of a player's pieces
+    self.refs = ({}, {})
+    self.wins = [0, 0]
+    if ('threats', width, height) not in _tables:
+      _tables['threats', width, height] = self.__tables()
+    self.open, self.full = _tables['threats', width, height]
+    for row in range(height):
+      for column in range(width):
+        if gameState[row][column] != 0:
+          self.place(row, column, gameState[row][column])
+
+  # the empty cell of a window with three of a player's pieces and none
+  # of the other's, and whether a window is a finished line, per player
+  # and state
+  def __tables(self):
+    size = 5 + 5*5 + 25 * 4 * (self.width * self.height - 1) + 1
+    empty = ([None] * size, [None] * size)
+    full = ([False] * size, [False] * size)
+    for state in range(size):
+      counts = (state % 5, state // 5 % 5)
+      for p in (0, 1):
+        mine, theirs = counts[p], counts[1-p]
+        if mine == 3 and not theirs:
+          empty[p][state] = state // 25
+        full[p][state] = mine == 4
+    return empty, full
+
+  def place(self, row, column, piece):
+    self.__update(row, column, piece, 1)
+
+  def remove(self, row, column, piece):
+    self.__update(row, column, piece, -1)
+
+  def __update(self, row, column, piece, sign):
+    step = sign * ((1 if piece == self.computer else 5) - 25 * (row * self.width + column))
+    state = self.state
+    for w in self.through[row][column]:
+      old = state[w]
+      new = old + step
+      state[w] = new
+      for p in (0, 1):
+        full, empty = self.full[p], self.open[p]
+        if full[new] != full[old]:
+          self.wins[p] += 1 if full[new] else -1
+        if empty[new] != empty[old]:
+          if empty[old] is not None:
+            self.__count(p, empty[old] * 4 + self.directions[w], -1)
+          if empty[new] is not None:
+            self.__count(p, empty[new] * 4 + self.directions[w], 1)
+
+  def __count(self, p, key, change):
+    refs = self.refs[p]
+    count = refs.get(key, 0) + change
+    if count:
+      refs[key] = count
+    else:
+      del refs[key]
+
+  # evaluateScore for the board this was kept in step with
+  def __call__(self, gameState, player, opponent):
+    if self.wins[1]:
+      winner = self.human
+    elif self.wins[0]:
+      winner = self.computer
+    else:
+      winner = 0
+    if winner == player:
+      return INF
+    elif winner == opponent:
+      return -INF
+    threats = (len(self.refs[0]), len(self.refs[1]))
+    if player == self.computer:
+      return threats[0] - threats[1]
+    return threats[1] - threats[0]
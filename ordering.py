@@ -0,0 +1,61 @@
+# move ordering for the alpha-beta searches. columns are tried in the
+# order: best move from the transposition table, killer moves for the
+# ply, history score, then center out. each part can be switched off
+# to compare cutoff rates
+class Ordering:
+ 
+  def __init__(self, width = 7, center = True, table = True, killers = True, history = True):
+    self.width = width
+    self.center = center
+    self.table = table
+    self.killers = killers
+    self.history = history
+    self.rank = dict((x, i) for i, x in enumerate(self.static()))
+    self.clear()
+ 
+  def clear(self):
+    self.killer = {}
+    self.scores = {}
+    # counters: nodes with moves to order, nodes that cut off and
+    # nodes that cut off on the first move tried
+    self.searched = 0
+    self.cutoffs = 0
+    self.first = 0
+ 
+  # static order, center column first then alternating outwards
+  def static(self):
+    middle = (self.width-1) / 2.0
+    return sorted(range(self.width), key = lambda x: abs(x - middle))
+ 
+  # columns sorted for side at ply, hint is the table's best move
+  def order(self, side, columns, ply, hint = None):
+    self.searched += 1
+    if not self.table:
+      hint = None
+    killers = self.killer.get(ply, ()) if self.killers else ()
+    scores = self.scores.get(side, {}) if self.history else {}
+    rank = self.rank if self.center else {}
+    return sorted(columns, key = lambda x: (x != hint, x not in killers, -scores.get(x, 0), rank.get(x, x)))
+ 
+  # x refuted the position at ply, tried as the index-th move
+  def cutoff(self, side, x, ply, depth, index = 0):
+    self.cutoffs += 1
+    if index == 0:
+      self.first += 1
+    if self.killers:
+      killers = self.killer.setdefault(ply, [])
+      if x not in killers:
+        killers.insert(0, x)
+        del killers[2:]
+    if self.history:
+      scores = self.scores.setdefault(side, {})
+      scores[x] = scores.get(x, 0) + depth*depth
+ 
+  def stats(self):
+    return {
+      'searched': self.searched,
+      'cutoffs': self.cutoffs,
+      'first': self.first,
+      'cutoff rate': self.cutoffs / float(self.searched) if self.searched else 0.0,
+      'first move rate': self.first / float(self.cutoffs) if self.cutoffs else 0.0,
+    }
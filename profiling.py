@@ -0,0 +1,92 @@
+import os
+import sys
+from io import StringIO
+from functools import wraps
+from threading import Thread, Event, get_ident
+
+# opt-in profiling of the engine entry points. set CONNECT4_PROFILE to a
+# directory, or call enable(directory), and every profiled call writes
+#
+#   <name>-<pid>-<n>.prof     cProfile data for pstats or snakeviz
+#   <name>-<pid>-<n>.txt      functions by cumulative time
+#   <name>-<pid>-<n>.folded   sampled collapsed stacks for flamegraph.pl
+#
+# while it is off a profiled entry point costs one global check per call
+directory = os.environ.get('CONNECT4_PROFILE') or None
+_calls = 0
+_active = False
+
+def enable(path = 'profiles'):
+  global directory
+  directory = path
+
+def disable():
+  global directory
+  directory = None
+
+# decorator for an entry point, profiles name when profiling is on.
+# calls made while another profiled call runs are part of that profile
+def profiled(name):
+  def decorate(function):
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+      if directory is None or _active:
+        return function(*args, **kwargs)
+      return _profile(name, function, args, kwargs)
+    return wrapper
+  return decorate
+
+def _profile(name, function, args, kwargs):
+  global _calls, _active
+  import cProfile
+  _active = True
+  _calls += 1
+  profile = cProfile.Profile()
+  sampler = Sampler(get_ident())
+  sampler.start()
+  try:
+    return profile.runcall(function, *args, **kwargs)
+  finally:
+    sampler.stop()
+    _active = False
+    write(os.path.join(directory, '{0}-{1}-{2}'.format(name, os.getpid(), _calls)), profile, sampler.stacks)
+
+def write(path, profile, stacks):
+  if os.path.dirname(path):
+    os.makedirs(os.path.dirname(path), exist_ok = True)
+  import pstats
+  profile.dump_stats(path + '.prof')
+  text = StringIO()
+  pstats.Stats(profile, stream = text).sort_stats('cumulative').print_stats(40)
+  with open(path + '.txt', 'w') as output:
+    output.write(text.getvalue())
+  with open(path + '.folded', 'w') as output:
+    for stack, count in sorted(stacks.items()):
+      output.write('{0} {1}\n'.format(stack, count))
+
+# samples the stack of one thread every interval seconds from a thread
+# of its own, the samples are counted per stack in collapsed form
+class Sampler(Thread):
+
+  def __init__(self, target, interval = 0.001):
+    Thread.__init__(self, daemon = True)
+    self.target = target
+    self.interval = interval
+    self.stacks = {}
+    self.stopped = Event()
+
+  def run(self):
+    while not self.stopped.wait(self.interval):
+      frame = sys._current_frames().get(self.target)
+      names = []
+      while frame is not None:
+        code = frame.f_code
+        names.append('{0} ({1}:{2})'.format(code.co_name, os.path.basename(code.co_filename), code.co_firstlineno))
+        frame = frame.f_back
+      if names:
+        stack = ';'.join(reversed(names))
+        self.stacks[stack] = self.stacks.get(stack, 0) + 1
+
+  def stop(self):
+    self.stopped.set()
+    self.join()
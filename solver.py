@@ -0,0 +1,222 @@
+import sys
+from time import time
+from transposition import Table
+from clock import Clock
+
+# exact solver. positions are two bitboards in the connect4.Board layout:
+# current holds the pieces of the side to move and mask holds all pieces.
+#
+# scores follow the usual convention: 0 is a draw, a win is positive for
+# the side to move and worth one point for every piece the winner still
+# has in hand after the winning move, plus one. so the quickest win
+# scores highest and a loss late in the game is better than an early one
+class Solver:
+
+  def __init__(self, width = 7, height = 6, megabytes = 16):
+    self.width = width
+    self.height = height
+    self.cells = width * height
+    self.table = Table(megabytes)
+    self.bottom = sum(1 << x*(height+1) for x in range(width))
+    self.full = self.bottom * ((1 << height) - 1)
+    self.columns = [((1 << height) - 1) << x*(height+1) for x in range(width)]
+    # center out, the columns that take part in the most lines first
+    middle = (width-1) / 2.0
+    self.order = sorted(range(width), key = lambda x: abs(x - middle))
+    self.nodes = 0
+    self.clock = None
+
+  # (current, mask, moves) for a list of columns played from the empty board
+  def position(self, history):
+    current, mask = 0, 0
+    for x in history:
+      current, mask = current ^ mask, mask | (mask + (1 << x*(self.height+1))) & self.columns[x]
+    return current, mask, len(history)
+
+  # empty cells where a piece would complete four for position
+  def winning(self, position, mask):
+    h = self.height + 1
+    # vertical
+    r = (position << 1) & (position << 2) & (position << 3)
+    for shift in (h, h+1, h-1):
+      # horizontal, diagonal and other diagonal, with both ends open
+      p = (position << shift) & (position << 2*shift)
+      r |= p & (position << 3*shift)
+      r |= p & (position >> shift)
+      p = (position >> shift) & (position >> 2*shift)
+      r |= p & (position << shift)
+      r |= p & (position >> 3*shift)
+    return r & (self.full ^ mask)
+
+  # one bit per column, the cell the next piece there lands on
+  def possible(self, mask):
+    return (mask + self.bottom) & self.full
+
+  def can_win_next(self, current, mask):
+    return self.winning(current, mask) & self.possible(mask)
+
+  # moves that don't hand the opponent an immediate win. a forced block
+  # is the only candidate, two threats at once leave nothing
+  def non_losing(self, current, mask):
+    possible = self.possible(mask)
+    threats = self.winning(current ^ mask, mask)
+    forced = possible & threats
+    if forced:
+      if forced & (forced - 1):
+        return 0
+      possible = forced
+    return possible & ~(threats >> 1)
+
+  # exact score of the position, report(passes, (lower, upper)) is told
+  # about the window after every null-window search. with think set the
+  # search raises clock.Timeout once it has run that many seconds, and
+  # as soon as stopped() is true when that is given. what it proved so
+  # far stays in the table for the next try
+  def solve(self, current, mask, moves, report = None, think = None, stopped = None):
+    if think is None and stopped is None:
+      return self.__solve(current, mask, moves, report)
+    self.clock = Clock(float('inf') if think is None else think, True, stopped)
+    try:
+      return self.__solve(current, mask, moves, report)
+    finally:
+      self.clock = None
+
+  def __solve(self, current, mask, moves, report):
+    if self.can_win_next(current, mask):
+      return (self.cells + 1 - moves) // 2
+    lower = -((self.cells - moves) // 2)
+    upper = (self.cells + 1 - moves) // 2
+    passes = 0
+    while lower < upper:
+      # aim the null window at 0 first, then close in, wins and losses
+      # are found faster with narrow windows near the edges
+      middle = lower + (upper - lower) // 2
+      if middle <= 0 and int(lower / 2) < middle:
+        middle = int(lower / 2)
+      elif middle >= 0 and upper // 2 > middle:
+        middle = upper // 2
+      value = self.__negamax(current, mask, moves, middle, middle + 1)
+      if value <= middle:
+        upper = value
+      else:
+        lower = value
+      passes += 1
+      if report:
+        report(passes, (lower, upper))
+    return lower
+
+  # best column and its exact score. the score comes first, then the
+  # columns are checked in search order with a null window until one
+  # reaches it. think and stopped limit the whole of it like they do solve
+  def best(self, current, mask, moves, report = None, think = None, stopped = None):
+    if think is None and stopped is None:
+      return self.__best(current, mask, moves, report)
+    self.clock = Clock(float('inf') if think is None else think, True, stopped)
+    try:
+      return self.__best(current, mask, moves, report)
+    finally:
+      self.clock = None
+
+  def __best(self, current, mask, moves, report):
+    possible = self.possible(mask)
+    if not possible:
+      return None, 0
+    winning = self.can_win_next(current, mask)
+    if winning:
+      return self.__column(winning & -winning), (self.cells + 1 - moves) // 2
+    score = self.__solve(current, mask, moves, report)
+    # the search assumes the side to move can't win at once, so only
+    # moves that leave the opponent no immediate win are checked
+    candidates = self.non_losing(current, mask)
+    if not candidates:
+      return self.__column(possible & -possible), score
+    for x in self.__ordered(current, mask, candidates):
+      move = candidates & self.columns[x]
+      child = current ^ mask, mask | move
+      if -self.__negamax(child[0], child[1], moves + 1, -score, -score + 1) >= score:
+        return x, score
+    return None, score
+
+  def __column(self, move):
+    return (move.bit_length() - 1) // (self.height + 1)
+
+  # playable columns, the ones that open the most threats first
+  def __ordered(self, current, mask, moves):
+    scored = []
+    for i, x in enumerate(self.order):
+      move = moves & self.columns[x]
+      if move:
+        threats = bin(self.winning(current | move, mask | move)).count('1')
+        scored.append((-threats, i, x))
+    scored.sort()
+    return [x for threats, i, x in scored]
+
+  # score within [alpha, beta], a value outside only says on which side
+  # of the window the exact score lies
+  def __negamax(self, current, mask, moves, alpha, beta):
+    self.nodes += 1
+    if self.clock and not self.nodes & Clock.INTERVAL:
+      self.clock.check()
+    moves_left = self.non_losing(current, mask)
+    if not moves_left:
+      return -((self.cells - moves) // 2)
+    if moves >= self.cells - 2:
+      return 0
+    # the opponent can't win next move, so the worst is losing after that
+    low = -((self.cells - 2 - moves) // 2)
+    if alpha < low:
+      alpha = low
+      if alpha >= beta:
+        return alpha
+    # and we can't win this move, so the best is winning with the next
+    high = (self.cells - 1 - moves) // 2
+    key = current + mask
+    lower, upper, hint = self.table.probe(key, 0)
+    if upper is not None and upper < high:
+      high = upper
+    if lower is not None and lower > low:
+      low = lower
+      if alpha < low:
+        alpha = low
+        if alpha >= beta:
+          return alpha
+    if beta > high:
+      beta = high
+      if alpha >= beta:
+        return beta
+    for x in self.__ordered(current, mask, moves_left):
+      move = moves_left & self.columns[x]
+      value = -self.__negamax(current ^ mask, mask | move, moves + 1, -beta, -alpha)
+      if value >= beta:
+        self.table.store(key, 0, lower = value)
+        return value
+      if value > alpha:
+        alpha = value
+    self.table.store(key, 0, upper = alpha)
+    return alpha
+
+# moves from the current position until the game ends with perfect play
+def distance(score, moves, width = 7, height = 6):
+  if score == 0:
+    return width * height - moves
+  # moves played before the winning one, whose parity says who wins
+  played = width * height + 1 - 2 * abs(score)
+  if (played - moves) % 2 != (0 if score > 0 else 1):
+    played -= 1
+  return played - moves + 1
+
+def main(argv = None):
+  argv = sys.argv[1:] if argv is None else argv
+  solver = Solver()
+  for line in argv or sys.stdin:
+    history = [int(c) - 1 for c in line.strip()]
+    start = time()
+    solver.nodes = 0
+    current, mask, moves = solver.position(history)
+    x, score = solver.best(current, mask, moves)
+    print('{0} score {1} distance {2} column {3} nodes {4} {5:.2f}s'.format(
+      line.strip(), score, distance(score, moves, solver.width, solver.height),
+      None if x is None else x + 1, solver.nodes, time() - start))
+
+if __name__ == '__main__':
+  main()
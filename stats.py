@@ -0,0 +1,84 @@
+from time import time
+
+# counters one search fills in as it goes. the engines keep the last
+# search's Stats where callers can read it: connect4.Board.stats and
+# another.searchStats. the hot path only bumps plain attributes
+class Stats:
+
+  def __init__(self):
+    self.start = time()
+    # where the move came from: search, book or endgame
+    self.source = 'search'
+    self.nodes = 0
+    self.leaves = 0
+    self.probes = 0
+    self.hits = 0
+    self.stores = 0
+    # remaining depth -> cutoffs there
+    self.cutoffs = {}
+    # nodes whose moves were ordered and cutoffs on the first move tried
+    self.ordered = 0
+    self.first = 0
+    self.passes = 0
+    self.depth = 0
+    # one entry per finished iteration
+    self.iterations = []
+    self.seconds = None
+
+  def cutoff(self, depth):
+    self.cutoffs[depth] = self.cutoffs.get(depth, 0) + 1
+
+  # counters of the ordering.Ordering the search used, which is cleared
+  # when a search starts, so they are this search's own
+  def order(self, ordering):
+    self.ordered += ordering.searched
+    self.first += ordering.first
+
+  # iteration to depth d just finished
+  def iteration(self, d):
+    seconds = time() - self.start
+    self.depth = d
+    self.iterations.append({
+      'depth': d,
+      'seconds': seconds - sum(i['seconds'] for i in self.iterations),
+      'nodes': self.nodes - sum(i['nodes'] for i in self.iterations),
+      'passes': self.passes - sum(i['passes'] for i in self.iterations),
+    })
+
+  # the search is over, the clock stops
+  def stop(self):
+    self.seconds = time() - self.start
+
+  # counters of a search run elsewhere, e.g. in a worker process, are
+  # added in. iterations stay this search's own
+  def merge(self, other):
+    self.nodes += other.nodes
+    self.leaves += other.leaves
+    self.probes += other.probes
+    self.hits += other.hits
+    self.stores += other.stores
+    self.passes += other.passes
+    self.ordered += other.ordered
+    self.first += other.first
+    for depth, count in other.cutoffs.items():
+      self.cutoffs[depth] = self.cutoffs.get(depth, 0) + count
+
+  def as_dict(self):
+    cutoffs = sum(self.cutoffs.values())
+    return {
+      'source': self.source,
+      'seconds': time() - self.start if self.seconds is None else self.seconds,
+      'nodes': self.nodes,
+      'leaves': self.leaves,
+      'probes': self.probes,
+      'hits': self.hits,
+      'stores': self.stores,
+      'hit rate': self.hits / float(self.probes) if self.probes else 0.0,
+      'cutoffs': dict(sorted(self.cutoffs.items())),
+      'ordered': self.ordered,
+      'cutoff rate': cutoffs / float(self.ordered) if self.ordered else 0.0,
+      'first move rate': self.first / float(cutoffs) if cutoffs else 0.0,
+      'passes': self.passes,
+      'depth': self.depth,
+      'iterations': list(self.iterations),
+    }
@@ -0,0 +1,163 @@
+import os
+import sys
+import mmap
+import struct
+from time import time
+from random import Random
+from book import mirror, find, ENTRY
+from solver import Solver
+
+# endgame tablebase: exact score and best column for positions with few
+# empty cells.
+#
+#   python tablebase.py --empty 10 --games 200
+#
+# plays 200 quiet random games up to 10 empty cells and solves everything
+# reachable from there by exhaustive negamax over the whole subtree,
+# writing endgame.table next to this file. every reachable position is
+# far too many to enumerate even for small thresholds, so the table
+# covers the subtrees of the seed positions and probe falls back to the
+# solver for the rest, which at this few empty cells takes milliseconds.
+#
+# keys, mirroring and lookups work like the opening book. entries are
+# key << 9 | (score + 32) << 3 | column
+PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'endgame.table')
+MAGIC = b'C4TB'
+HEADER = struct.Struct('<4sHHHQ6x')
+# positions with at most this many empty cells are probed
+EMPTY = 12
+
+class Tablebase:
+
+  def __init__(self, mapped, width, height, empty, count):
+    self.mapped = mapped
+    self.width = width
+    self.height = height
+    self.empty = empty
+    self.count = count
+
+  # the table at path, None when there is no usable table there
+  @classmethod
+  def open(cls, path = PATH):
+    try:
+      with open(path, 'rb') as stored:
+        magic, width, height, empty, count = HEADER.unpack(stored.read(HEADER.size))
+        if magic != MAGIC or os.fstat(stored.fileno()).st_size != HEADER.size + ENTRY.size * count:
+          return None
+        if not count:
+          return cls(None, width, height, empty, 0)
+        mapped = mmap.mmap(stored.fileno(), 0, access = mmap.ACCESS_READ)
+    except (IOError, OSError, struct.error):
+      return None
+    return cls(mapped, width, height, empty, count)
+
+  def __len__(self):
+    return self.count
+
+  # (column, score) stored for the position, or None
+  def move(self, current, mask, width = 7, height = 6):
+    if not self.count or (width, height) != (self.width, self.height):
+      return None
+    key = current + mask
+    mirrored = mirror(current, width, height) + mirror(mask, width, height)
+    entry = find(self.mapped, HEADER.size, self.count, min(key, mirrored), 9)
+    if entry is None:
+      return None
+    column = entry & 7
+    score = ((entry >> 3) & 63) - 32
+    return (column if key <= mirrored else width-1-column), score
+
+# whether a position moves into a board of cells is close enough to
+# the end to probe, at most EMPTY empty cells or as many as the table
+# was built for
+def reaches(table, cells, moves):
+  return cells - moves <= (max(EMPTY, table.empty) if table else EMPTY)
+
+# (column, score) with perfect play for a position in reach, from the
+# table when it has it, otherwise solved. only positions within EMPTY
+# are solved, a table built deeper can miss positions the solver would
+# take far too long on, and the search has to answer those instead.
+# None for positions further from the end or with no moves left
+def probe(table, solver, current, mask, moves):
+  if not reaches(table, solver.cells, moves) or not solver.possible(mask):
+    return None
+  found = table.move(current, mask, solver.width, solver.height) if table else None
+  if found:
+    return found
+  if solver.cells - moves > EMPTY:
+    return None
+  return solver.best(current, mask, moves)
+
+# exact (score, column) of every position below current, mask, keyed
+# by the smaller of the position's key and its mirror's into entries
+def expand(solver, current, mask, moves, entries):
+  key = current + mask
+  mirrored = mirror(current, solver.width, solver.height) + mirror(mask, solver.width, solver.height)
+  canonical = min(key, mirrored)
+  if canonical in entries:
+    return entries[canonical][0]
+  possible = solver.possible(mask)
+  winning = solver.can_win_next(current, mask)
+  if winning:
+    best = (solver.cells + 1 - moves) // 2, (winning.bit_length() - 1) // (solver.height + 1)
+  else:
+    best = None
+    for x in solver.order:
+      move = possible & solver.columns[x]
+      if not move:
+        continue
+      if moves + 1 == solver.cells:
+        score = 0
+      else:
+        score = -expand(solver, current ^ mask, mask | move, moves + 1, entries)
+      if best is None or score > best[0]:
+        best = score, x
+  column = best[1] if key <= mirrored else solver.width-1-best[1]
+  entries[canonical] = best[0], column
+  return best[0]
+
+# positions with exactly empty cells left from random games. the games
+# neither take nor allow wins so most of them last that long
+def seeds(solver, games, empty, seed = 0):
+  rng = Random(seed)
+  found = []
+  for game in range(games):
+    current, mask, moves = 0, 0, 0
+    while moves < solver.cells - empty:
+      quiet = solver.non_losing(current, mask) & ~solver.winning(current, mask)
+      if not quiet:
+        break
+      move = rng.choice([quiet & column for column in solver.columns if quiet & column])
+      current, mask, moves = current ^ mask, mask | move, moves + 1
+    else:
+      found.append((current, mask, moves))
+  return found
+
+def build(empty, games, seed = 0, path = PATH):
+  solver = Solver()
+  entries = {}
+  for current, mask, moves in seeds(solver, games, empty, seed):
+    expand(solver, current, mask, moves, entries)
+  temporary = path + '.tmp'
+  with open(temporary, 'wb') as stored:
+    stored.write(HEADER.pack(MAGIC, solver.width, solver.height, empty, len(entries)))
+    for canonical in sorted(entries):
+      score, column = entries[canonical]
+      stored.write(ENTRY.pack(canonical << 9 | (score + 32) << 3 | column))
+  os.replace(temporary, path)
+  return len(entries)
+
+def main(argv = None):
+  import argparse
+  parser = argparse.ArgumentParser(description = 'build the endgame tablebase')
+  parser.add_argument('--empty', type = int, default = 10, help = 'solve positions from this many empty cells on')
+  parser.add_argument('--games', type = int, default = 200, help = 'random games that pick the seed positions')
+  parser.add_argument('--seed', type = int, default = 0, help = 'random seed for the games')
+  parser.add_argument('--output', default = PATH, help = 'table file to write')
+  args = parser.parse_args(argv)
+  start = time()
+  count = build(args.empty, args.games, args.seed, args.output)
+  sys.stderr.write('{0} positions in {1:.1f}s\n'.format(count, time() - start))
+
+if __name__ == '__main__':
+  main()
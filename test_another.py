@@ -0,0 +1,226 @@
+import unittest
+from random import Random
+
+import another
+from ordering import Ordering
+
+try:
+  import numpy
+except ImportError:
+  numpy = None
+
+# another's searches and scans against the code they replaced
+
+# list board after moves (1 based columns), the side to move is the computer
+def game_state(moves):
+  state = [[0] * another.BOARD_WIDTH for y in range(another.BOARD_HEIGHT)]
+  heights = [0] * another.BOARD_WIDTH
+  piece = another.COMPUTER_PLAYER if len(moves) % 2 == 0 else another.HUMAN_PLAYER
+  for move in moves:
+    x = int(move) - 1
+    state[another.BOARD_HEIGHT - 1 - heights[x]][x] = piece
+    heights[x] += 1
+    piece = -piece
+  return state
+
+# legal positions from random games that are still going, the computer to move
+def random_games(rng, count):
+  found = []
+  while len(found) < count:
+    moves = ''
+    state = game_state(moves)
+    for i in range(rng.randrange(0, 30, 2)):
+      columns = [x for x in range(another.BOARD_WIDTH) if state[0][x] == 0]
+      moves += str(rng.choice(columns) + 1)
+      state = game_state(moves)
+      if another.checkWin(state):
+        break
+    else:
+      found.append(moves)
+  return found
+
+# random list boards for another.py: legal positions of random length
+# and, every fifth one, pieces scattered anywhere
+def random_states(rng, count):
+  for n in range(count):
+    state = [[0] * another.BOARD_WIDTH for y in range(another.BOARD_HEIGHT)]
+    if rng.random() < 0.2:
+      yield [[rng.choice((0, 1, -1)) for x in range(another.BOARD_WIDTH)] for y in range(another.BOARD_HEIGHT)]
+      continue
+    heights = [0] * another.BOARD_WIDTH
+    piece = another.COMPUTER_PLAYER
+    for i in range(rng.randint(0, another.BOARD_WIDTH * another.BOARD_HEIGHT)):
+      x = rng.choice([x for x in range(another.BOARD_WIDTH) if heights[x] < another.BOARD_HEIGHT])
+      state[another.BOARD_HEIGHT - 1 - heights[x]][x] = piece
+      heights[x] += 1
+      piece = -piece
+    yield state
+
+# another.checkWin as it scanned rows, columns and diagonals before it
+# went over the shared windows, numpy only found the diagonals
+def scanning_check_win(gameState):
+  current = 0
+  currentCount = 0
+  computer_wins = 0
+  opponent_wins = 0
+
+  # Check horizontal wins
+  for i in range(0, another.BOARD_HEIGHT):
+    for j in range(0, another.BOARD_WIDTH):
+      if currentCount == 0:
+        if gameState[i][j] != 0:
+          current = gameState[i][j]
+          currentCount += 1
+      elif currentCount == 4:
+        if current == another.COMPUTER_PLAYER:
+          computer_wins += 1
+        else:
+          opponent_wins += 1
+        currentCount = 0
+        break
+      elif gameState[i][j] != current:
+        if gameState[i][j] != 0:
+          current = gameState[i][j]
+          currentCount = 1
+        else:
+          current = 0
+          currentCount = 0
+      else:
+        currentCount += 1
+
+    if currentCount == 4:
+      if current == another.COMPUTER_PLAYER:
+        computer_wins += 1
+      else:
+        opponent_wins += 1
+    current = 0
+    currentCount = 0
+
+  # Check vertical wins
+  for j in range(0, another.BOARD_WIDTH):
+    for i in range(0, another.BOARD_HEIGHT):
+      if currentCount == 0:
+        if gameState[i][j] != 0:
+          current = gameState[i][j]
+          currentCount += 1
+      elif currentCount == 4:
+        if current == another.COMPUTER_PLAYER:
+          computer_wins += 1
+        else:
+          opponent_wins += 1
+        currentCount = 0
+        break
+      elif gameState[i][j] != current:
+        if gameState[i][j] != 0:
+          current = gameState[i][j]
+          currentCount = 1
+        else:
+          current = 0
+          currentCount = 0
+      else:
+        currentCount += 1
+
+    if currentCount == 4:
+      if current == another.COMPUTER_PLAYER:
+        computer_wins += 1
+      else:
+        opponent_wins += 1
+    current = 0
+    currentCount = 0
+
+  # Check diagonal wins
+  np_matrix = numpy.array(gameState)
+  diags = [np_matrix[::-1, :].diagonal(i)
+      for i in range(-np_matrix.shape[0]+1, np_matrix.shape[1])]
+  diags.extend(np_matrix.diagonal(i)
+        for i in range(np_matrix.shape[1]-1, -np_matrix.shape[0], -1))
+  diags_list = [n.tolist() for n in diags]
+
+  for i in range(0, len(diags_list)):
+    if len(diags_list[i]) >= 4:
+      for j in range(0, len(diags_list[i])):
+        if currentCount == 0:
+          if diags_list[i][j] != 0:
+            current = diags_list[i][j]
+            currentCount += 1
+        elif currentCount == 4:
+          if current == another.COMPUTER_PLAYER:
+            computer_wins += 1
+          else:
+            opponent_wins += 1
+          currentCount = 0
+          break
+        elif diags_list[i][j] != current:
+          if diags_list[i][j] != 0:
+            current = diags_list[i][j]
+            currentCount = 1
+          else:
+            current = 0
+            currentCount = 0
+        else:
+          currentCount += 1
+
+      if currentCount == 4:
+        if current == another.COMPUTER_PLAYER:
+          computer_wins += 1
+        else:
+          opponent_wins += 1
+      current = 0
+      currentCount = 0
+
+  if opponent_wins > 0:
+    return another.HUMAN_PLAYER
+  elif computer_wins > 0:
+    return another.COMPUTER_PLAYER
+  else:
+    return 0
+
+class TestNegamax(unittest.TestCase):
+
+  def setUp(self):
+    self.ordering = another.moveOrdering
+    # the same fixed column order for both searches
+    another.moveOrdering = Ordering(another.BOARD_WIDTH, killers = False, history = False)
+
+  def tearDown(self):
+    another.moveOrdering = self.ordering
+
+  # minimax only scores its leaves for the side it maximizes at even
+  # depths, see negamax, so that is where the two have to agree
+  def test_same_as_minimax(self):
+    for moves in random_games(Random(9), 30):
+      for depth in (2, 4):
+        state = game_state(moves)
+        heights = [sum(1 for row in state if row[x] != 0) for x in range(another.BOARD_WIDTH)]
+        expected = another.minimax(state, depth, another.COMPUTER_PLAYER, another.HUMAN_PLAYER, another.evaluateScore)
+        found = another.negamax(state, heights, depth, float('-inf'), float('inf'),
+                                another.COMPUTER_PLAYER, another.HUMAN_PLAYER, another.evaluateScore)
+        self.assertEqual(found, expected, (moves, depth))
+        self.assertEqual(state, game_state(moves))
+
+@unittest.skipIf(numpy is None, 'needs numpy')
+class TestVectorized(unittest.TestCase):
+
+  def test_same_as_evaluate_score(self):
+    for state in random_states(Random(6), 5000):
+      for player in (another.COMPUTER_PLAYER, another.HUMAN_PLAYER):
+        self.assertEqual(another.evaluateScoreVectorized(state, player, -player),
+                         another.evaluateScore(state, player, -player))
+
+  def test_benchmark_positions(self):
+    from benchmark import POSITIONS
+    for phase, name, moves in POSITIONS:
+      state = game_state(moves)
+      for player in (another.COMPUTER_PLAYER, another.HUMAN_PLAYER):
+        self.assertEqual(another.evaluateScoreVectorized(state, player, -player),
+                         another.evaluateScore(state, player, -player), name)
+
+@unittest.skipIf(numpy is None, 'needs numpy')
+class TestCheckWin(unittest.TestCase):
+
+  def test_same_as_scan(self):
+    for state in random_states(Random(7), 20000):
+      self.assertEqual(another.checkWin(state), scanning_check_win(state), state)
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+from random import Random
+
+import connect4
+from transposition import Table
+from ordering import Ordering
+
+# MTD(f) against one full-window alpha-beta search of the same depth:
+# the same score, and a move that is worth it. both run from empty
+# tables and orderings, a table left by one search would change the
+# other's bounds
+
+# histories of random games still going after ply moves
+def positions(rng, count):
+  found = []
+  while len(found) < count:
+    board = connect4.Board()
+    for i in range(rng.randrange(0, 30)):
+      board.play(rng.choice(board.columns()))
+      if board.won():
+        break
+    else:
+      found.append(list(board.history))
+  return found
+
+class TestMTDF(unittest.TestCase):
+
+  def setUp(self):
+    self.saved = connect4.Board.nodes, connect4.Board.ordering
+
+  def tearDown(self):
+    connect4.Board.nodes, connect4.Board.ordering = self.saved
+
+  def fresh(self):
+    connect4.Board.nodes = Table(1)
+    connect4.Board.ordering = Ordering()
+
+  def board(self, history):
+    board = connect4.Board()
+    for x in history:
+      board.play(x)
+    return board
+
+  def test_same_as_full_window(self):
+    for history in positions(Random(19), 25):
+      for depth in range(1, 5):
+        board = self.board(history)
+        self.fresh()
+        full = board._Board__minimax(True, depth, -1000, 1000)
+        self.fresh()
+        found = board._Board__mtdf((3, None), depth)
+        self.assertEqual(found[0], full[0], (history, depth))
+        self.assertEqual(board.history, history)
+        # columns can tie, the one played has to be worth the score
+        self.assertIn(found[1], board.columns())
+        self.fresh()
+        reply = board.move(found[1])
+        value = reply._Board__minimax(False, depth-1, -1000, 1000)[0]
+        self.assertEqual(value, full[0], (history, depth, found[1]))
+
+if __name__ == '__main__':
+  unittest.main()
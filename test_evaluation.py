@@ -0,0 +1,196 @@
+import unittest
+from random import Random
+
+import connect4
+import another
+from evaluation import Threats
+from test_another import game_state, random_states
+
+# the incremental evaluators against the scanning code they replaced,
+# over random games with moves taken back and played again
+
+# connect4.Board's heuristic as the original Board computed it, by
+# scanning fields for the lines each player can still complete: every
+# such line scores its pieces times the board height less the mean
+# height of its empty cells, and a cell that ends a three together
+# with the cell below it scores height - 100y
+def scanning_heuristic(board):
+  fields, empty = board.fields, board.empty
+
+  def winlines(player):
+    lines = []
+    # horizontal
+    for y in range(board.height):
+      winning = []
+      for x in range(board.width):
+        if fields[x, y] == player or fields[x, y] == empty:
+          winning.append((x, y))
+          if len(winning) >= 4:
+            lines.append(winning[-4:])
+        else:
+          winning = []
+    # vertical
+    for x in range(board.width):
+      winning = []
+      for y in range(board.height):
+        if fields[x, y] == player or fields[x, y] == empty:
+          winning.append((x, y))
+          if len(winning) >= 4:
+            lines.append(winning[-4:])
+        else:
+          winning = []
+    # diagonal
+    for cx in range(board.width-1):
+      sx, sy = max(cx-2, 0), abs(min(cx-2, 0))
+      winning = []
+      for cy in range(board.height):
+        x, y = sx+cy, sy+cy
+        if x < 0 or y < 0 or x >= board.width or y >= board.height:
+          continue
+        if fields[x, y] == player or fields[x, y] == empty:
+          winning.append((x, y))
+          if len(winning) >= 4:
+            lines.append(winning[-4:])
+        else:
+          winning = []
+    # other diagonal
+    for cx in range(board.width-1):
+      sx, sy = board.width-1-max(cx-2, 0), abs(min(cx-2, 0))
+      winning = []
+      for cy in range(board.height):
+        x, y = sx-cy, sy+cy
+        if x < 0 or y < 0 or x >= board.width or y >= board.height:
+          continue
+        if fields[x, y] == player or fields[x, y] == empty:
+          winning.append((x, y))
+          if len(winning) >= 4:
+            lines.append(winning[-4:])
+        else:
+          winning = []
+    return lines
+
+  def winpositions(lines, player):
+    positions = {}
+    for line in lines:
+      pieces = 0
+      gap = None
+      for x, y in line:
+        if fields[x, y] == player:
+          pieces += 1
+        elif fields[x, y] == empty:
+          if gap is not None:
+            break
+          gap = (x, y)
+      if pieces == 3:
+        positions[x, y] = True
+    return positions
+
+  def score(player):
+    lines = winlines(player)
+    positions = winpositions(lines, player)
+    total = 0
+    for x in range(board.width):
+      for y in range(board.height-1, 0, -1):
+        if (x, y) in positions and (x, y-1) in positions:
+          total += board.height - y*100
+    for line in lines:
+      pieces = 0
+      height = []
+      for x, y in line:
+        if fields[x, y] == player:
+          pieces += 1
+        elif fields[x, y] == empty:
+          height.append(y)
+      total += pieces * (board.height - int(sum(height) / float(len(height))))
+    return total
+
+  return score(board.player) - score(board.opponent)
+
+class TestHeuristic(unittest.TestCase):
+
+  def test_play_undo(self):
+    rng = Random(3)
+    checked = 0
+    for game in range(200):
+      board = connect4.Board()
+      while not board.won() and not board.tied():
+        board.play(rng.choice(board.columns()))
+        if rng.random() < 0.2:
+          x = board.history[-1]
+          board.undo()
+          board.play(x)
+        if not board.won():
+          self.assertEqual(board.evaluation.score(board.player), scanning_heuristic(board), board.history)
+          self.assertEqual(board.evaluation.score(board.opponent), -scanning_heuristic(board))
+          checked += 1
+        if rng.random() < 0.1:
+          board = connect4.Board(board)
+      while board.history:
+        board.undo()
+      self.assertEqual(board.evaluation.state, connect4.Board().evaluation.state)
+      self.assertEqual(board.evaluation.score(board.player), 0)
+    self.assertGreater(checked, 3000)
+
+  def test_copy_is_independent(self):
+    board = connect4.Board()
+    for x in (3, 3, 2, 4):
+      board.play(x)
+    copy = connect4.Board(board)
+    copy.play(1)
+    self.assertEqual(board.evaluation.score(board.player), scanning_heuristic(board))
+    self.assertEqual(copy.evaluation.score(copy.player), scanning_heuristic(copy))
+
+class TestThreats(unittest.TestCase):
+
+  def test_play_undo(self):
+    rng = Random(4)
+    checked = 0
+    for game in range(200):
+      state = [[0] * another.BOARD_WIDTH for y in range(another.BOARD_HEIGHT)]
+      threats = Threats(state)
+      heights = [0] * another.BOARD_WIDTH
+      piece = another.COMPUTER_PLAYER
+      for i in range(another.BOARD_WIDTH * another.BOARD_HEIGHT):
+        x = rng.choice([x for x in range(another.BOARD_WIDTH) if heights[x] < another.BOARD_HEIGHT])
+        row = another.BOARD_HEIGHT - 1 - heights[x]
+        state[row][x] = piece
+        threats.place(row, x, piece)
+        if rng.random() < 0.2:
+          threats.remove(row, x, piece)
+          state[row][x] = 0
+          threats.place(row, x, piece)
+          state[row][x] = piece
+        heights[x] += 1
+        piece = -piece
+        for player in (another.COMPUTER_PLAYER, another.HUMAN_PLAYER):
+          self.assertEqual(threats(state, player, -player), another.evaluateScore(state, player, -player))
+          checked += 1
+        if another.checkWin(state):
+          break
+    self.assertGreater(checked, 5000)
+
+  def test_from_scratch(self):
+    for state in random_states(Random(5), 2000):
+      for player in (another.COMPUTER_PLAYER, another.HUMAN_PLAYER):
+        self.assertEqual(another.evaluateScoreIncremental(state, player, -player),
+                         another.evaluateScore(state, player, -player))
+
+  # the search keeps one Threats in step with its moves, it has to see
+  # the same scores and so search the same tree as with evaluateScore
+  def test_search(self):
+    book, table = another.openingBook, another.endgameTable
+    another.openingBook = another.endgameTable = None
+    try:
+      for moves in ('', '44', '742772574233', '1174377451174277'):
+        results = []
+        for evaluate in (another.evaluateScore, another.evaluateScoreIncremental):
+          state = game_state(moves)
+          move = another.bestMove(state, another.COMPUTER_PLAYER, another.HUMAN_PLAYER, evaluate, 4)
+          results.append((move, another.searchStats.nodes))
+          self.assertEqual(state, game_state(moves))
+        self.assertEqual(results[0], results[1], moves)
+    finally:
+      another.openingBook, another.endgameTable = book, table
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,166 @@
+import unittest
+from random import Random
+
+import connect4
+from clock import Timeout
+from solver import Solver, distance
+
+# the solver against plain negamax over every move, on endgames small
+# enough to search exhaustively
+
+# exact score of board for the side to move, in the solver's units,
+# with every position searched once
+def brute_force(board, seen):
+  key = (board.bits[board.player], board.bits[board.opponent])
+  if key in seen:
+    return seen[key]
+  cells = board.width * board.height
+  columns = board.columns()
+  score = None
+  for x in columns:
+    board.play(x)
+    won = board.won()
+    board.undo()
+    if won:
+      score = (cells + 1 - board.count) // 2
+      break
+  if score is None:
+    if not columns:
+      score = 0
+    else:
+      score = max(-child_score(board, x, seen) for x in columns)
+  seen[key] = score
+  return score
+
+def child_score(board, x, seen):
+  board.play(x)
+  score = brute_force(board, seen)
+  board.undo()
+  return score
+
+# histories of random games with empty cells left, nobody has won yet
+def endgames(rng, count, empty):
+  found = []
+  while len(found) < count:
+    board = connect4.Board()
+    while board.width * board.height - board.count > empty:
+      board.play(rng.choice(board.columns()))
+      if board.won():
+        break
+    else:
+      found.append(list(board.history))
+  return found
+
+class TestSolver(unittest.TestCase):
+
+  def setUp(self):
+    self.solver = Solver(megabytes = 1)
+
+  def test_solve(self):
+    for history in endgames(Random(11), 40, 10):
+      board = connect4.Board()
+      for x in history:
+        board.play(x)
+      expected = brute_force(board, {})
+      current, mask, moves = self.solver.position(history)
+      self.assertEqual(self.solver.solve(current, mask, moves), expected, history)
+
+  # the column best picks has to reach the score it gives
+  def test_best(self):
+    for history in endgames(Random(12), 40, 10):
+      board = connect4.Board()
+      for x in history:
+        board.play(x)
+      seen = {}
+      expected = brute_force(board, seen)
+      current, mask, moves = self.solver.position(history)
+      x, score = self.solver.best(current, mask, moves)
+      self.assertEqual(score, expected, history)
+      board.play(x)
+      if not board.won():
+        self.assertEqual(-brute_force(board, seen), expected, (history, x))
+
+  def test_report(self):
+    windows = []
+    # one where the side to move can't win at once, which needs no passes
+    for history in endgames(Random(13), 20, 12):
+      current, mask, moves = self.solver.position(history)
+      if not self.solver.can_win_next(current, mask):
+        break
+    score = self.solver.solve(current, mask, moves, lambda passes, window: windows.append(window))
+    self.assertTrue(windows)
+    self.assertEqual(windows[-1], (score, score))
+    for lower, upper in windows:
+      self.assertLessEqual(lower, score)
+      self.assertGreaterEqual(upper, score)
+
+class TestDistance(unittest.TestCase):
+
+  # a win on the move after played moves, for every side and length
+  def test_wins(self):
+    cells = 42
+    for moves in range(cells):
+      for played in range(moves, cells):
+        score = (cells + 1 - played) // 2
+        if (played - moves) % 2:
+          score = -score
+        self.assertEqual(distance(score, moves), played - moves + 1, (moves, played))
+
+  def test_draw(self):
+    self.assertEqual(distance(0, 30), 12)
+    self.assertEqual(distance(0, 0), 42)
+
+  # distance of the solver's score is how long perfect play lasts
+  def test_solved(self):
+    board = connect4.Board()
+    for x in endgames(Random(14), 1, 10)[0]:
+      board.play(x)
+    solver = Solver(megabytes = 1)
+    while not board.won() and not board.tied():
+      current = board.bits[board.player]
+      mask = current | board.bits[board.opponent]
+      x, score = solver.best(current, mask, board.count)
+      left = distance(score, board.count)
+      board.play(x)
+      if board.won() or board.tied():
+        self.assertEqual(left, 1)
+
+class TestDeadline(unittest.TestCase):
+
+  def test_timeout(self):
+    solver = Solver(megabytes = 1)
+    current, mask, moves = solver.position([3, 3])
+    with self.assertRaises(Timeout):
+      solver.solve(current, mask, moves, think = 0.05)
+    with self.assertRaises(Timeout):
+      solver.best(current, mask, moves, stopped = lambda: True)
+    self.assertIsNone(solver.clock)
+    # what it proved before the deadline is still good
+    history = endgames(Random(15), 1, 10)[0]
+    board = connect4.Board()
+    for x in history:
+      board.play(x)
+    current, mask, moves = solver.position(history)
+    self.assertEqual(solver.solve(current, mask, moves, think = 60), brute_force(board, {}))
+
+  # perfect play searches what it can't solve in time
+  def test_fallback(self):
+    class Worker:
+      def cancelled(self):
+        return False
+    gui = object.__new__(connect4.GUI)
+    gui.perfect = True
+    gui.worker = Worker()
+    gui.PERFECT = 0.05
+    book = connect4.Board.book
+    connect4.Board.book = None
+    try:
+      board = connect4.Board()
+      x = gui.search(board, lambda *args: None)
+    finally:
+      connect4.Board.book = book
+    self.assertIn(x, board.columns())
+    self.assertEqual(connect4.Board.stats.source, 'search')
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,63 @@
+import os
+import unittest
+from tempfile import TemporaryDirectory
+
+from book import ENTRY
+from solver import Solver
+from tablebase import Tablebase, MAGIC, HEADER, EMPTY, reaches, probe
+
+# the solver that probe falls back on, counting the positions it is asked
+class Counting(Solver):
+
+  def __init__(self):
+    Solver.__init__(self, megabytes = 1)
+    self.asked = 0
+
+  def best(self, current, mask, moves, report = None, think = None, stopped = None):
+    self.asked += 1
+    return Solver.best(self, current, mask, moves, report, think, stopped)
+
+class TestProbe(unittest.TestCase):
+
+  def position(self, solver, empty):
+    # columns filled bottom up in an order that never makes four
+    history = []
+    for x in (0, 1, 4, 5, 2, 3, 6):
+      for y in range(6):
+        history.append(x if y % 2 == 0 else (x + 1) % 7)
+    history = history[:solver.cells - empty]
+    return solver.position(history)
+
+  def test_solved_within_empty(self):
+    solver = Counting()
+    current, mask, moves = self.position(solver, EMPTY - 2)
+    self.assertTrue(reaches(None, solver.cells, moves))
+    x, score = probe(None, solver, current, mask, moves)
+    self.assertEqual(solver.asked, 1)
+    self.assertEqual((x, score), Solver(megabytes = 1).best(current, mask, moves))
+
+  def test_out_of_reach(self):
+    solver = Counting()
+    current, mask, moves = self.position(solver, EMPTY + 4)
+    self.assertFalse(reaches(None, solver.cells, moves))
+    self.assertIsNone(probe(None, solver, current, mask, moves))
+    self.assertEqual(solver.asked, 0)
+
+  # a table built deeper than EMPTY is used that deep, but what it
+  # doesn't have is left to the search rather than solved
+  def test_deeper_table_miss(self):
+    solver = Counting()
+    current, mask, moves = self.position(solver, EMPTY + 4)
+    with TemporaryDirectory() as directory:
+      path = os.path.join(directory, 'table')
+      with open(path, 'wb') as stored:
+        stored.write(HEADER.pack(MAGIC, solver.width, solver.height, EMPTY + 8, 1))
+        stored.write(ENTRY.pack(1 << 9))
+      table = Tablebase.open(path)
+      self.assertTrue(reaches(table, solver.cells, moves))
+      self.assertIsNone(probe(table, solver, current, mask, moves))
+      self.assertEqual(solver.asked, 0)
+      table.mapped.close()
+
+if __name__ == '__main__':
+  unittest.main()
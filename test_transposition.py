@@ -0,0 +1,170 @@
+import os
+import unittest
+from tempfile import TemporaryDirectory
+
+from transposition import Table, OFFSET, HEADER, MAGIC, ORDER
+
+# packing, replacement and aging of the transposition table. keys that
+# are a multiple of the bucket count apart share a bucket
+class TestTable(unittest.TestCase):
+
+  def setUp(self):
+    self.table = Table(1)
+    self.buckets = self.table.buckets
+
+  def test_pack_unpack(self):
+    table = self.table
+    cases = [
+      (1, 0, None, None, None),
+      (2, 63, -7, 12, 0),
+      (3, 17, OFFSET - 1, None, 6),
+      (4, 1, None, -OFFSET, 14),
+      (5, 9, -OFFSET, OFFSET - 1, 3),
+      (2**64 - 1, 40, 999, -999, 5),
+    ]
+    for key, depth, lower, upper, move in cases:
+      table.store(key, depth, lower, upper, move)
+      self.assertEqual(table.probe(key, depth), (lower, upper, move), key)
+
+  def test_misses(self):
+    table = self.table
+    self.assertEqual(table.probe(10, 3), (None, None, None))
+    table.store(10, 3, lower = 5, move = 2)
+    self.assertEqual(table.probe(10, 4), (None, None, None))
+    self.assertEqual(table.probe(10 + self.buckets, 3), (None, None, None))
+    self.assertEqual(len(table), 1)
+    table.clear()
+    self.assertEqual(table.probe(10, 3), (None, None, None))
+    self.assertEqual(len(table), 0)
+
+  # a second bound for the same position and depth joins the first,
+  # a move only replaces the stored one when there is a new one
+  def test_merge(self):
+    table = self.table
+    table.store(10, 3, lower = -2, move = 4)
+    table.store(10, 3, upper = 8)
+    self.assertEqual(table.probe(10, 3), (-2, 8, 4))
+    table.store(10, 3, lower = 1, move = 5)
+    self.assertEqual(table.probe(10, 3), (1, 8, 5))
+    self.assertEqual(len(table), 1)
+
+  def test_replacement(self):
+    table = self.table
+    a, b, c, d, e = [7 + i * self.buckets for i in range(5)]
+    table.store(a, 5, lower = 1)
+    # shallower, the deeper entry keeps the depth-preferred slot
+    table.store(b, 3, lower = 2)
+    self.assertEqual(table.probe(a, 5)[0], 1)
+    self.assertEqual(table.probe(b, 3)[0], 2)
+    # as deep or deeper takes the depth-preferred slot
+    table.store(c, 5, lower = 3)
+    self.assertEqual(table.probe(a, 5)[0], None)
+    self.assertEqual(table.probe(b, 3)[0], 2)
+    self.assertEqual(table.probe(c, 5)[0], 3)
+    # shallower again goes to the always-replace slot
+    table.store(d, 1, lower = 4)
+    self.assertEqual(table.probe(b, 3)[0], None)
+    self.assertEqual(table.probe(c, 5)[0], 3)
+    self.assertEqual(table.probe(d, 1)[0], 4)
+    # an entry from an older search gives way to anything
+    table.age()
+    table.store(e, 0, lower = 5)
+    self.assertEqual(table.probe(c, 5)[0], None)
+    self.assertEqual(table.probe(d, 1)[0], 4)
+    self.assertEqual(table.probe(e, 0)[0], 5)
+
+  # the best move of any depth, the deepest entry's when both slots
+  # hold the position, and none when no entry has a move
+  def test_hint(self):
+    table = self.table
+    self.assertIsNone(table.hint(7))
+    table.store(7, 2, lower = 1)
+    self.assertIsNone(table.hint(7))
+    table.store(7, 6, lower = 1, move = 4)
+    table.store(7, 3, upper = 2, move = 1)
+    self.assertEqual(table.hint(7), 4)
+    self.assertIsNone(table.hint(7 + self.buckets))
+
+  def test_generation_wraps(self):
+    table = self.table
+    for i in range(256):
+      table.age()
+    self.assertEqual(table.generation, 0)
+    table.store(7, 2, upper = 3)
+    self.assertEqual(table.probe(7, 2), (None, 3, None))
+
+# save writes a file that load maps back copy-on-write, anything that
+# isn't a whole table file loads as an empty table instead
+class TestFile(unittest.TestCase):
+
+  def setUp(self):
+    self.directory = TemporaryDirectory()
+    self.path = os.path.join(self.directory.name, 'table')
+
+  def tearDown(self):
+    self.directory.cleanup()
+
+  def saved(self):
+    table = Table(1)
+    table.age()
+    table.store(12345, 3, lower = 7, move = 2)
+    table.store(99, 0, upper = -4)
+    table.save(self.path)
+    return table
+
+  def test_round_trip(self):
+    table = self.saved()
+    loaded = Table.load(self.path)
+    self.assertEqual(loaded.buckets, table.buckets)
+    self.assertEqual(loaded.generation, 1)
+    self.assertEqual(loaded.probe(12345, 3), (7, None, 2))
+    self.assertEqual(loaded.probe(99, 0), (None, -4, None))
+    self.assertEqual(len(loaded), 2)
+    self.assertFalse(os.path.exists(self.path + '.tmp'))
+
+  # changes stay in memory until the table is saved again, over the
+  # file it is still mapped from
+  def test_save_over_mapped_file(self):
+    self.saved()
+    loaded = Table.load(self.path)
+    loaded.store(555, 4, lower = 1)
+    self.assertEqual(Table.load(self.path).probe(555, 4), (None, None, None))
+    loaded.save(self.path)
+    self.assertEqual(loaded.probe(12345, 3), (7, None, 2))
+    again = Table.load(self.path)
+    self.assertEqual(again.probe(555, 4), (1, None, None))
+    self.assertEqual(again.probe(12345, 3), (7, None, 2))
+
+  def assertEmpty(self, table, megabytes):
+    self.assertEqual(len(table), 0)
+    self.assertEqual(table.buckets, Table(megabytes).buckets)
+    table.store(1, 1, lower = 1)
+    self.assertEqual(table.probe(1, 1), (1, None, None))
+
+  def test_missing(self):
+    self.assertEmpty(Table.load(self.path, 2), 2)
+
+  def test_corrupt(self):
+    self.saved()
+    with open(self.path, 'r+b') as stored:
+      stored.write(b'XXXX')
+    self.assertEmpty(Table.load(self.path, 2), 2)
+
+  def test_truncated(self):
+    self.saved()
+    with open(self.path, 'r+b') as stored:
+      stored.truncate(HEADER.size + 100)
+    self.assertEmpty(Table.load(self.path, 2), 2)
+
+  def test_short_header(self):
+    with open(self.path, 'wb') as stored:
+      stored.write(b'C4T')
+    self.assertEmpty(Table.load(self.path, 2), 2)
+
+  def test_no_buckets(self):
+    with open(self.path, 'wb') as stored:
+      stored.write(HEADER.pack(MAGIC, ORDER, 0, 0))
+    self.assertEmpty(Table.load(self.path, 2), 2)
+
+if __name__ == '__main__':
+  unittest.main()
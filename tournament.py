@@ -0,0 +1,206 @@
+import sys
+import json
+import math
+import argparse
+from time import time
+from random import Random
+from itertools import combinations, product
+
+import connect4
+import another
+from benchmark import board, game_state
+from transposition import Table
+from ordering import Ordering
+
+# headless matches between engines. engines are given as
+# name[:key=value,...]:
+#
+#   connect4:think=0.5       Board.best with that budget, depth caps it
+#   another:depth=5          another.bestMove to that depth
+#   random                   a random legal column, as a weak anchor
+#
+# every pair of engines plays every opening twice, each side moving
+# first once, spread over a process pool. the report has win/draw/loss
+# per pair with an Elo difference, games per minute and move latency
+
+# search state per engine, side to move and process, so two engines of
+# the same kind never see each other's tables, killers or history. the
+# table's scores are from the root side's point of view and its keys
+# don't say which side that was, so each side gets a table of its own
+_searches = {}
+
+def parse(spec):
+  name, _, options = spec.partition(':')
+  if name not in PLAYERS:
+    raise ValueError('unknown engine: ' + spec)
+  settings = {}
+  for option in filter(None, options.split(',')):
+    key, _, value = option.partition('=')
+    settings[key] = float(value) if key == 'think' else int(value)
+  return name, settings
+
+def play_connect4(spec, settings, moves, rng):
+  side = len(moves) % 2
+  if (spec, side) not in _searches:
+    _searches[spec, side] = Table(16), Ordering()
+  connect4.Board.nodes, connect4.Board.ordering = _searches[spec, side]
+  return board(moves).best(settings.get('think', 2), settings.get('depth'))
+
+def play_another(spec, settings, moves, rng):
+  if spec not in _searches:
+    _searches[spec] = Ordering(another.BOARD_WIDTH)
+  another.moveOrdering = _searches[spec]
+  return another.bestMove(game_state(moves), another.COMPUTER_PLAYER, another.HUMAN_PLAYER,
+                          another.evaluateScoreIncremental, settings.get('depth', another.PRUNED_SEARCH_DEPTH))
+
+def play_random(spec, settings, moves, rng):
+  return rng.choice(board(moves).columns())
+
+PLAYERS = {
+  'connect4': play_connect4,
+  'another': play_another,
+  'random': play_random,
+}
+
+# every sequence of ply columns that doesn't finish the game, written
+# like the benchmark positions
+def openings(ply):
+  found = []
+  for columns in product(range(7), repeat = ply):
+    position = connect4.Board()
+    for x in columns:
+      if x not in position.columns() or position.won():
+        break
+      position.play(x)
+    else:
+      if not position.won():
+        found.append(''.join(str(x+1) for x in columns))
+  return found
+
+# one game from opening, first moves next. the result is from first's
+# side: 1 for a win, 0.5 for a draw and 0 for a loss
+def game(job):
+  first, second, opening, seed = job
+  rng = Random(seed)
+  position = board(opening)
+  moves = opening
+  players = (first, second)
+  times = ([], [])
+  while not position.won() and not position.tied():
+    turn = (len(moves) - len(opening)) % 2
+    name, settings = parse(players[turn])
+    start = time()
+    x = PLAYERS[name](players[turn], settings, moves, rng)
+    times[turn].append(time() - start)
+    position.play(x)
+    moves += str(x+1)
+  if not position.won():
+    result = 0.5
+  else:
+    result = 1.0 if (len(moves) - len(opening)) % 2 == 1 else 0.0
+  return {'first': first, 'second': second, 'opening': opening, 'moves': moves,
+          'result': result, 'times': {first: times[0], second: times[1]}}
+
+def percentile(values, p):
+  if not values:
+    return 0.0
+  values = sorted(values)
+  return values[min(len(values)-1, int(math.ceil(p / 100.0 * len(values))) - 1)]
+
+# Elo difference for a mean score and its 95% margin from the spread of
+# the individual results
+def elo(scores):
+  mean = sum(scores) / float(len(scores))
+  deviation = math.sqrt(sum((s - mean)**2 for s in scores) / len(scores)) / math.sqrt(len(scores))
+  def difference(p):
+    p = min(max(p, 1e-3), 1 - 1e-3)
+    return -400 * math.log10(1/p - 1)
+  return difference(mean), (difference(mean + 1.96*deviation) - difference(mean - 1.96*deviation)) / 2
+
+def report(games, seconds):
+  engines = {}
+  pairs = {}
+  for played in games:
+    first, second, result = played['first'], played['second'], played['result']
+    for spec, score in ((first, result), (second, 1 - result)):
+      stats = engines.setdefault(spec, {'wins': 0, 'draws': 0, 'losses': 0, 'times': []})
+      stats['wins' if score == 1 else 'losses' if score == 0 else 'draws'] += 1
+    for spec in (first, second):
+      engines[spec]['times'].extend(played['times'][spec])
+    a, b = sorted((first, second))
+    pairs.setdefault((a, b), []).append(result if first == a else 1 - result)
+  for spec, stats in engines.items():
+    times = stats.pop('times')
+    stats['score'] = (stats['wins'] + 0.5*stats['draws']) / float(stats['wins'] + stats['draws'] + stats['losses'])
+    stats['latency'] = {
+      'moves': len(times),
+      'mean': sum(times) / len(times) if times else 0.0,
+      'p50': percentile(times, 50),
+      'p90': percentile(times, 90),
+      'p99': percentile(times, 99),
+      'max': max(times) if times else 0.0,
+    }
+  matches = []
+  for (a, b), scores in sorted(pairs.items()):
+    difference, margin = elo(scores)
+    matches.append({
+      'engine': a,
+      'opponent': b,
+      'wins': scores.count(1.0),
+      'draws': scores.count(0.5),
+      'losses': scores.count(0.0),
+      'score': sum(scores) / len(scores),
+      'elo': difference,
+      'elo margin': margin,
+    })
+  return {
+    'games': len(games),
+    'seconds': seconds,
+    'games per minute': 60 * len(games) / seconds if seconds > 0 else 0.0,
+    'engines': engines,
+    'matches': matches,
+  }
+
+def run(specs, ply = 2, rounds = 1, workers = None, seed = 0):
+  jobs = []
+  for a, b in combinations(specs, 2):
+    for opening in openings(ply):
+      for r in range(rounds):
+        jobs.append((a, b, opening, seed + len(jobs)))
+        jobs.append((b, a, opening, seed + len(jobs)))
+  start = time()
+  if workers == 1:
+    games = [game(job) for job in jobs]
+  else:
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(workers) as pool:
+      games = list(pool.map(game, jobs, chunksize = 4))
+  return report(games, time() - start)
+
+def main(argv = None):
+  parser = argparse.ArgumentParser(description = 'play the connect 4 engines against each other')
+  parser.add_argument('--engine', action = 'append', help = 'engine as name[:key=value,...], repeat for several (default: connect4:think=0.25 and another:depth=4)')
+  parser.add_argument('--openings', type = int, default = 2, help = 'start from every opening this many moves deep')
+  parser.add_argument('--rounds', type = int, default = 1, help = 'times every opening is played per pair and side')
+  parser.add_argument('--workers', type = int, help = 'processes to play in (default: one per cpu)')
+  parser.add_argument('--seed', type = int, default = 0, help = 'seed for the random engine')
+  parser.add_argument('--output', help = 'write the JSON report here instead of stdout')
+  args = parser.parse_args(argv)
+  specs = args.engine or ['connect4:think=0.25', 'another:depth=4']
+  for spec in specs:
+    try:
+      parse(spec)
+    except ValueError as error:
+      parser.error(str(error))
+  if len(set(specs)) < 2:
+    parser.error('need at least two different engines')
+  result = run(list(dict.fromkeys(specs)), args.openings, args.rounds, args.workers, args.seed)
+  if args.output:
+    with open(args.output, 'w') as output:
+      json.dump(result, output, indent = 2)
+  else:
+    json.dump(result, sys.stdout, indent = 2)
+    sys.stdout.write('\n')
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,147 @@
+import os
+import sys
+import mmap
+import struct
+
+# entries are packed into one 64 bit word next to their 64 bit key:
+#   bits  0-7   generation the entry was written in
+#   bits  8-9   bound type, 1 = lower bound stored, 2 = upper bound stored
+#   bits 10-13  best move, 15 when there is none
+#   bits 14-19  depth
+#   bits 20-39  lower bound + offset
+#   bits 40-59  upper bound + offset
+LOWER = 1
+UPPER = 2
+NOMOVE = 15
+OFFSET = 1 << 19
+FIELD = (1 << 20) - 1
+MISSING = (None, None, None)
+
+# file layout: a 32 byte header (magic, byte order, bucket count,
+# generation) followed by the key array and then the data array
+MAGIC = b'C4TT'
+HEADER = struct.Struct('<4s4sQQ8x')
+ORDER = (sys.byteorder + '    ')[:4].encode()
+# anonymous maps are private, so a process forked from this one writes
+# into its own copy. windows has no fork and no such flag
+PRIVATE = {'flags': mmap.MAP_PRIVATE} if hasattr(mmap, 'MAP_PRIVATE') else {}
+
+class Table:
+
+  # every bucket holds two entries: a depth-preferred slot that keeps the
+  # deepest entry of the current generation and an always-replace slot
+  def __init__(self, megabytes = 16):
+    self.megabytes = megabytes
+    self.buckets = max(1, int(megabytes * 2**20) // 32)
+    self.generation = 0
+    self.clear()
+
+  # anonymous maps come zeroed and are only backed by memory as they
+  # are touched, so a new table costs next to nothing until it fills
+  def clear(self):
+    self.keys = memoryview(mmap.mmap(-1, 16 * self.buckets, **PRIVATE)).cast('Q')
+    self.data = memoryview(mmap.mmap(-1, 16 * self.buckets, **PRIVATE)).cast('Q')
+
+  # table saved at path, or an empty one when there is no usable file.
+  # the file is mapped copy-on-write, so nothing is read up front, pages
+  # come in as probes touch them and changes stay in memory until save
+  @classmethod
+  def load(cls, path, megabytes = 16):
+    table = cls(0)
+    try:
+      with open(path, 'rb') as stored:
+        magic, order, buckets, generation = HEADER.unpack(stored.read(HEADER.size))
+        if magic != MAGIC or order != ORDER or not buckets:
+          raise ValueError('not a transposition table: ' + path)
+        if os.fstat(stored.fileno()).st_size != HEADER.size + 32 * buckets:
+          raise ValueError('truncated transposition table: ' + path)
+        mapped = mmap.mmap(stored.fileno(), 0, access = mmap.ACCESS_COPY)
+    except (IOError, OSError, ValueError, struct.error):
+      return cls(megabytes)
+    table.buckets = buckets
+    table.megabytes = 32 * buckets / float(2**20)
+    table.generation = generation
+    view = memoryview(mapped)[HEADER.size:]
+    table.keys = view[:16 * buckets].cast('Q')
+    table.data = view[16 * buckets:].cast('Q')
+    return table
+
+  # written to a temporary file next to path and renamed over it, so a
+  # crash half way through never leaves a broken table behind
+  def save(self, path):
+    temporary = path + '.tmp'
+    with open(temporary, 'wb') as stored:
+      stored.write(HEADER.pack(MAGIC, ORDER, self.buckets, self.generation))
+      stored.write(self.keys)
+      stored.write(self.data)
+      stored.flush()
+      os.fsync(stored.fileno())
+    os.replace(temporary, path)
+
+  # called between moves, entries from older searches are replaced first
+  def age(self):
+    self.generation = (self.generation + 1) & 255
+
+  # (lower, upper, move) stored for key at exactly this depth
+  def probe(self, key, depth):
+    index = (key % self.buckets) * 2
+    for slot in (index, index+1):
+      entry = self.data[slot]
+      if entry and self.keys[slot] == key and (entry >> 14) & 63 == depth:
+        return self.__unpack(entry)
+    return MISSING
+
+  # best move stored for key at any depth, the deepest entry's if both
+  # slots hold the position. a move from another depth is still the
+  # best first guess for ordering
+  def hint(self, key):
+    index = (key % self.buckets) * 2
+    best = None
+    for slot in (index, index+1):
+      entry = self.data[slot]
+      if entry and self.keys[slot] == key and (entry >> 10) & 15 != NOMOVE:
+        if best is None or (entry >> 14) & 63 > (best >> 14) & 63:
+          best = entry
+    return None if best is None else (best >> 10) & 15
+
+  def store(self, key, depth, lower = None, upper = None, move = None):
+    index = (key % self.buckets) * 2
+    keys, data = self.keys, self.data
+    # same position and depth, merge the new bound into the entry
+    for slot in (index, index+1):
+      entry = data[slot]
+      if entry and keys[slot] == key and (entry >> 14) & 63 == depth:
+        old = self.__unpack(entry)
+        data[slot] = self.__pack(depth,
+                                 old[0] if lower is None else lower,
+                                 old[1] if upper is None else upper,
+                                 old[2] if move is None else move)
+        return
+    entry = data[index]
+    if not entry or entry & 255 != self.generation or depth >= (entry >> 14) & 63:
+      slot = index
+    else:
+      slot = index+1
+    keys[slot] = key
+    data[slot] = self.__pack(depth, lower, upper, move)
+
+  # number of occupied entries
+  def __len__(self):
+    return sum(1 for entry in self.data if entry)
+
+  def __pack(self, depth, lower, upper, move):
+    entry = self.generation | depth << 14
+    if lower is not None:
+      entry |= LOWER << 8 | (lower + OFFSET) << 20
+    if upper is not None:
+      entry |= UPPER << 8 | (upper + OFFSET) << 40
+    if move is None:
+      move = NOMOVE
+    return entry | move << 10
+
+  def __unpack(self, entry):
+    bound = (entry >> 8) & 3
+    move = (entry >> 10) & 15
+    lower = ((entry >> 20) & FIELD) - OFFSET if bound & LOWER else None
+    upper = ((entry >> 40) & FIELD) - OFFSET if bound & UPPER else None
+    return (lower, upper, None if move == NOMOVE else move)
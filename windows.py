@@ -0,0 +1,49 @@
+# every four-cell window (possible line of four) on the board, built once
+# per board geometry and shared by the evaluators and win detection
+_tables = {}
+
+HORIZONTAL = 0
+VERTICAL = 1
+DIAGONAL = 2
+OTHER_DIAGONAL = 3
+
+def table(width = 7, height = 6):
+  if (width, height) not in _tables:
+    _tables[width, height] = Windows(width, height)
+  return _tables[width, height]
+
+class Windows:
+
+  # cells are (x, y) from the bottom left, bits use the Board bitboard
+  # layout where column x owns bits x*(height+1) .. x*(height+1)+height-1
+  def __init__(self, width, height):
+    self.width = width
+    self.height = height
+    self.cells = []
+    self.bits = []
+    self.masks = []
+    self.directions = []
+    # cell -> indexes of the windows through it
+    self.through = dict(((x, y), []) for x in range(width) for y in range(height))
+    # same order the old line scans produced: left to right, bottom to
+    # top, and up along each diagonal
+    steps = ((HORIZONTAL, 1, 0), (VERTICAL, 0, 1), (DIAGONAL, 1, 1), (OTHER_DIAGONAL, -1, 1))
+    for direction, dx, dy in steps:
+      for y in range(height):
+        for x in range(width):
+          cells = [(x + i*dx, y + i*dy) for i in range(4)]
+          if all(0 <= cx < width and 0 <= cy < height for cx, cy in cells):
+            self.add(direction, cells)
+
+  def add(self, direction, cells):
+    index = len(self.cells)
+    bits = [1 << (x*(self.height+1) + y) for x, y in cells]
+    self.cells.append(cells)
+    self.bits.append(bits)
+    self.masks.append(sum(bits))
+    self.directions.append(direction)
+    for cell in cells:
+      self.through[cell].append(index)
+
+  def __len__(self):
+    return len(self.cells)
@@ -0,0 +1,88 @@
+from threading import Thread, local
+from queue import Queue, Empty
+
+class Cancelled(Exception):
+  pass
+
+# runs engine searches off the Tk thread. results come back through a
+# queue that is polled with app.after, so done and progress callbacks
+# always run on the Tk thread. starting a new search or cancelling drops
+# whatever the old one still reports. searches never overlap: a new one
+# waits in its thread for the cancelled one to stop, since both share
+# the engine's tables. a search that only learns it was cancelled at
+# its next report can keep the new one waiting for a whole iteration,
+# so searches that can should also poll cancelled() as they go
+class Worker:
+
+  def __init__(self, app, interval = 50):
+    self.app = app
+    self.interval = interval
+    self.results = Queue()
+    self.job = 0
+    self.polling = None
+    self.busy = False
+    self.thread = None
+    # job of the search running in the current thread
+    self.running = local()
+
+  # search(report) runs in a thread and returns the result for done,
+  # report(depth, ...) passes progress on and raises Cancelled once the
+  # search is stale, which ends it at its next report
+  def start(self, search, done, progress = None):
+    self.cancel()
+    job = self.job
+    def report(*args):
+      if job != self.job:
+        raise Cancelled()
+      self.results.put((job, 'progress', args))
+    previous = self.thread
+    def run():
+      if previous:
+        previous.join()
+      if job != self.job:
+        return
+      self.running.job = job
+      try:
+        result = search(report)
+      except Cancelled:
+        return
+      except Exception as error:
+        self.results.put((job, 'error', error))
+        return
+      self.results.put((job, 'done', result))
+    self.busy = True
+    self.thread = Thread(target = run, daemon = True)
+    self.thread.start()
+    self.polling = self.app.after(self.interval, self.__poll, done, progress)
+
+  # whether the search calling this has been cancelled or replaced,
+  # safe to call from the search's thread as often as it likes
+  def cancelled(self):
+    return getattr(self.running, 'job', self.job) != self.job
+
+  def cancel(self):
+    self.job += 1
+    self.busy = False
+    if self.polling:
+      self.app.after_cancel(self.polling)
+      self.polling = None
+
+  def __poll(self, done, progress):
+    self.polling = None
+    while True:
+      try:
+        job, kind, value = self.results.get_nowait()
+      except Empty:
+        break
+      if job != self.job:
+        continue
+      if kind == 'progress':
+        if progress:
+          progress(*value)
+      else:
+        self.busy = False
+        if kind == 'error':
+          raise value
+        done(value)
+        return
+    self.polling = self.app.after(self.interval, self.__poll, done, progress)